@@ -0,0 +1,85 @@
+"""Compara o loop síncrono do main.py com o modo asyncio contra o mock local.
+
+    python -m benchmarks.bench_async_extract --cpfs 2000 --concurrency 50
+
+O banco não participa da medição: `handle_result` vira no-op para isolar a
+extração HTTP.
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault(
+    "SQLALCHEMY_DATABASE_URI", "postgresql://bench@localhost/bench"
+)
+os.environ.setdefault("RESPONSE_CACHE_TTL", "0")  # mede só a rede
+os.environ.setdefault("RESPONSE_ARCHIVE_DIR", "")
+
+from benchmarks.mock_ro_server import fake_cpf, serve_in_background
+from src.api import ExtractTransformLoad
+from src.async_api import AsyncExtractTransformLoad
+from src.core.rate_limiter import AdaptiveRateLimiter
+
+CURRENT_SLEEP = 5  # time.sleep(5) do main.main
+
+
+class SyncBench(ExtractTransformLoad):
+    def handle_result(self, cpf, data):
+        pass
+
+
+class AsyncBench(AsyncExtractTransformLoad):
+    def handle_result(self, cpf, data):
+        pass
+
+
+def unlimited():
+    # mede só a extração; o ritmo real é decidido pelo limiter adaptativo
+    return AdaptiveRateLimiter(initial_rate=1e6, max_rate=1e6)
+
+
+def fake_cpfs(n: int):
+    return [fake_cpf(i) for i in range(n)]
+
+
+def bench_sync(route: str, n: int) -> float:
+    etl = SyncBench(rate_limiter=unlimited())
+    etl.base_url, etl.token = route, "bench"
+    started = time.perf_counter()
+    for cpf in fake_cpfs(n):
+        etl.get_request(cpf)
+    return n / (time.perf_counter() - started)
+
+
+def bench_async(route: str, n: int, concurrency: int) -> float:
+    etl = AsyncBench(concurrency=concurrency, rate_limiter=unlimited())
+    etl.base_url, etl.token = route, "bench"
+    started = time.perf_counter()
+    etl.run_etl(fake_cpfs(n))
+    return n / (time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cpfs", type=int, default=2000)
+    parser.add_argument("--sync-cpfs", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server, route = serve_in_background(latency=args.latency)
+    try:
+        sync_rate = bench_sync(route, args.sync_cpfs)
+        async_rate = bench_async(route, args.cpfs, args.concurrency)
+    finally:
+        server.shutdown()
+
+    # o loop atual ainda dorme 5s por CPF; extrapolamos para não esperar
+    current_rate = 1 / (CURRENT_SLEEP + 1 / sync_rate)
+    print(f"main.py atual (sleep {CURRENT_SLEEP}s): {current_rate:8.2f} CPF/s")
+    print(f"síncrono sem sleep:           {sync_rate:8.2f} CPF/s")
+    label = f"asyncio ({args.concurrency:>3} em voo):"
+    print(f"{label:<30}{async_rate:8.2f} CPF/s")
+    print(f"ganho vs. síncrono sem sleep: {async_rate / sync_rate:8.1f}x")
+    print(f"ganho vs. main.py atual:      {async_rate / current_rate:8.1f}x")
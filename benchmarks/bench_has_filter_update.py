@@ -0,0 +1,115 @@
+"""Latência do UPDATE por CPF em função do tamanho da tabela, sem e com índice.
+
+    BENCH_DATABASE_URI=postgresql://... \\
+        python -m benchmarks.bench_has_filter_update --sizes 10000 1000000
+
+Usa um schema descartável (`bench_spreed`) com o mesmo formato de
+spreed.ro e os mesmos índices da migração 0002_lookup_indexes; o schema é
+removido no final.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+SCHEMA = "bench_spreed"
+
+INDEXES = [
+    f"CREATE INDEX ix_ro_cpf ON {SCHEMA}.ro (cpf)",
+    f"CREATE INDEX ix_ro_pending_id ON {SCHEMA}.ro (id) "
+    "WHERE has_filter = false",
+]
+
+
+def setup_table(conn, size: int):
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(
+        text(
+            f"CREATE TABLE {SCHEMA}.ro ("
+            "id SERIAL PRIMARY KEY, cpf VARCHAR(11), nome VARCHAR(100), "
+            "has_filter BOOLEAN DEFAULT false)"
+        )
+    )
+    conn.execute(
+        text(
+            f"INSERT INTO {SCHEMA}.ro (cpf, nome, has_filter) "
+            "SELECT lpad(g::text, 11, '0'), 'LEAD ' || g, g % 4 = 0 "
+            "FROM generate_series(1, :size) g"
+        ),
+        {"size": size},
+    )
+    conn.execute(text(f"ANALYZE {SCHEMA}.ro"))
+
+
+def time_updates(conn, size: int, samples: int) -> float:
+    """Mediana (ms) do UPDATE ... WHERE cpf = :cpf usado pelo ETL"""
+    timings = []
+    for _ in range(samples):
+        cpf = str(random.randint(1, size)).zfill(11)
+        started = time.perf_counter()
+        conn.execute(
+            text(
+                f"UPDATE {SCHEMA}.ro SET has_filter = true WHERE cpf = :cpf"
+            ),
+            {"cpf": cpf},
+        )
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def time_pending_page(conn) -> float:
+    """Tempo (ms) de uma página de iter_pending_cpfs no meio da tabela"""
+    started = time.perf_counter()
+    conn.execute(
+        text(
+            f"SELECT id, cpf FROM {SCHEMA}.ro "
+            "WHERE has_filter = false AND id > "
+            f"(SELECT max(id) / 2 FROM {SCHEMA}.ro) "
+            "ORDER BY id LIMIT 1000"
+        )
+    ).all()
+    return (time.perf_counter() - started) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--samples", type=int, default=50)
+    args = parser.parse_args()
+
+    url = os.getenv("BENCH_DATABASE_URI") or os.getenv(
+        "SQLALCHEMY_DATABASE_URI"
+    )
+    bench_engine = create_engine(url, isolation_level="AUTOCOMMIT")
+
+    print(
+        f"{'linhas':>10} | {'update s/ índice':>16} | "
+        f"{'update c/ índice':>16} | {'página s/':>9} | {'página c/':>9}"
+    )
+    try:
+        with bench_engine.connect() as conn:
+            for size in args.sizes:
+                setup_table(conn, size)
+                before = time_updates(conn, size, args.samples)
+                page_before = time_pending_page(conn)
+
+                for ddl in INDEXES:
+                    conn.execute(text(ddl))
+                conn.execute(text(f"ANALYZE {SCHEMA}.ro"))
+                after = time_updates(conn, size, args.samples)
+                page_after = time_pending_page(conn)
+
+                print(
+                    f"{size:>10} | {before:>13.2f} ms | {after:>13.2f} ms | "
+                    f"{page_before:>6.1f} ms | {page_after:>6.1f} ms"
+                )
+    finally:
+        with bench_engine.connect() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
@@ -0,0 +1,65 @@
+"""Latência por requisição: `requests.get` avulso vs. RoHttpClient.
+
+    python -m benchmarks.bench_http_pool --requests 500
+    python -m benchmarks.bench_http_pool --url https://exemplo.gov.br/ping
+
+Sem `--url` usa o mock local (HTTP puro, só economiza o handshake TCP);
+apontando para um host HTTPS a diferença inclui o handshake TLS.
+"""
+
+import argparse
+import statistics
+import time
+
+import requests
+
+from benchmarks.mock_ro_server import serve_in_background
+from src.core.http_client import USER_AGENT, RoHttpClient
+
+
+def bare_get(url: str, token: str) -> float:
+    headers = {"User-Agent": USER_AGENT, "Authorization": f"Bearer {token}"}
+    started = time.perf_counter()
+    requests.get(url, headers=headers, timeout=10)
+    return time.perf_counter() - started
+
+
+def pooled_get(client: RoHttpClient, url: str) -> float:
+    started = time.perf_counter()
+    client.get(url)
+    return time.perf_counter() - started
+
+
+def summary(samples: list) -> str:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    return f"média {statistics.mean(ms):7.2f} ms | p95 {p95:7.2f} ms"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server, route = serve_in_background(latency=0)
+        url = route.format(cpf="12345678909")
+
+    try:
+        bare = [bare_get(url, "bench") for _ in range(args.requests)]
+
+        client = RoHttpClient(workers=1, token="bench")
+        client.warm_up(url)
+        pooled = [pooled_get(client, url) for _ in range(args.requests)]
+        client.close()
+    finally:
+        if server:
+            server.shutdown()
+
+    saved = statistics.mean(bare) - statistics.mean(pooled)
+    print(f"requests.get avulso: {summary(bare)}")
+    print(f"RoHttpClient:        {summary(pooled)}")
+    print(f"economia por requisição: {saved * 1000:.2f} ms")
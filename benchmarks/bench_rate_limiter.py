@@ -0,0 +1,66 @@
+"""Mostra o AdaptiveRateLimiter convergindo para o limite do servidor.
+
+    python -m benchmarks.bench_rate_limiter --max-rps 40 --seconds 30
+
+O mock devolve 429 acima de `--max-rps`; o limiter deve oscilar logo abaixo
+desse valor em vez de ficar preso no ritmo inicial.
+"""
+
+import argparse
+import os
+import threading
+import time
+
+os.environ.setdefault(
+    "SQLALCHEMY_DATABASE_URI", "postgresql://bench@localhost/bench"
+)
+os.environ.setdefault("RESPONSE_CACHE_TTL", "0")  # mede só a rede
+os.environ.setdefault("RESPONSE_ARCHIVE_DIR", "")
+
+from benchmarks.mock_ro_server import fake_cpf, serve_in_background
+from src.async_api import AsyncExtractTransformLoad
+from src.core.rate_limiter import AdaptiveRateLimiter
+
+
+class AsyncBench(AsyncExtractTransformLoad):
+    def handle_result(self, cpf, data):
+        pass
+
+
+def endless_cpfs(stop: threading.Event):
+    i = 0
+    while not stop.is_set():
+        i += 1
+        yield fake_cpf(i)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-rps", type=float, default=40)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    server, route = serve_in_background(latency=0.02, max_rps=args.max_rps)
+    limiter = AdaptiveRateLimiter(
+        initial_rate=1, max_rate=args.max_rps * 5, report_interval=1e9
+    )
+    etl = AsyncBench(concurrency=args.concurrency, rate_limiter=limiter)
+    etl.base_url, etl.token = route, "bench"
+
+    stop = threading.Event()
+    runner = threading.Thread(target=etl.run_etl, args=(endless_cpfs(stop),))
+    runner.start()
+    started = time.monotonic()
+    try:
+        while time.monotonic() - started < args.seconds:
+            time.sleep(1)
+            print(
+                f"t={time.monotonic() - started:5.1f}s "
+                f"rate={limiter.current_rate:6.2f} req/s "
+                f"ok={etl.processed} 429/falhas={etl.failed}"
+            )
+    finally:
+        stop.set()
+        runner.join()
+        server.shutdown()
@@ -0,0 +1,60 @@
+"""Tempo de obtenção do token via OAuthTokenClient contra o oauth/token mock.
+
+    python -m benchmarks.bench_token_client --rounds 20
+
+Também confere o caminho de erro (senha errada -> OAuthTokenError) e uma
+renovação completa pelo TokenManager, gravando o token em um diretório
+temporário. Para comparar com o Selenium, cronometre `login_gov` no portal
+real: o Chrome sozinho leva segundos só para subir.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.mock_ro_server import (
+    MOCK_PASSWORD,
+    MOCK_USERNAME,
+    serve_in_background,
+    token_url,
+)
+from src.core.token_client import OAuthTokenClient, OAuthTokenError
+from src.core.token_manager import TokenManager, write_token_file
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    server, _ = serve_in_background(latency=0)
+    url = token_url(server)
+    try:
+        client = OAuthTokenClient(url, MOCK_USERNAME, MOCK_PASSWORD)
+        timings = []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            client.fetch()
+            timings.append(time.perf_counter() - started)
+        print(
+            f"OAuthTokenClient: média {statistics.mean(timings) * 1000:.1f} ms"
+            f" em {args.rounds} tokens"
+        )
+
+        try:
+            OAuthTokenClient(url, MOCK_USERNAME, "errada").fetch()
+            print("ERRO: senha errada não gerou OAuthTokenError")
+        except OAuthTokenError as e:
+            print(f"Senha errada -> OAuthTokenError ({e})")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "token_response.json")
+            manager = TokenManager(
+                path=path,
+                login=lambda: write_token_file(client.fetch(), path),
+            )
+            info = manager.refresh()
+            print(f"TokenManager renovado via HTTP: {info!r}")
+    finally:
+        server.shutdown()
@@ -0,0 +1,54 @@
+"""Transformação item a item (build_result_rows) vs. em lote (frame).
+
+    python -m benchmarks.bench_transform --cpfs 20000 --items 2
+
+Confere que as duas versões geram exatamente as mesmas linhas (inclusive o
+content_hash) antes de medir. O lote é medido até o DataFrame, que é o que
+o BulkResultWriter manda por COPY.
+"""
+
+import argparse
+import time
+
+from benchmarks.mock_ro_server import fake_cpf, fake_payload
+from src.core.transform import build_result_frame, build_result_rows
+
+
+def per_item(payloads: list) -> list:
+    return [
+        row for cpf, data in payloads for row in build_result_rows(data, cpf)
+    ]
+
+
+def best_of(fn, payloads: list, rounds: int) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn(payloads)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cpfs", type=int, default=20000)
+    parser.add_argument(
+        "--items", type=int, default=2, help="vínculos por CPF"
+    )
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    payloads = []
+    for i in range(args.cpfs):
+        cpf = fake_cpf(i)
+        payloads.append((cpf, fake_payload(cpf) * args.items))
+
+    frame = build_result_frame(payloads)
+    assert per_item(payloads) == frame.to_dict(orient="records")
+
+    item_s = best_of(per_item, payloads, args.rounds)
+    batch_s = best_of(build_result_frame, payloads, args.rounds)
+    rows = args.cpfs * args.items
+    print(f"item a item: {rows / item_s:10,.0f} linhas/s ({item_s:.3f}s)")
+    print(f"em lote:     {rows / batch_s:10,.0f} linhas/s ({batch_s:.3f}s)")
+    print(f"ganho:       {item_s / batch_s:10.1f}x")
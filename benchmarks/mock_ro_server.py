@@ -0,0 +1,165 @@
+"""Servidor HTTP local que imita a rota ROUTE_RO para benchmarks.
+
+Uso isolado:
+    python -m benchmarks.mock_ro_server --port 8099 --latency 0.05
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src.utils.cpf import complete_cpf
+
+ROUTE_PATH = "/servidor/buscarPorMatriculaCpfSequencia"
+TOKEN_PATH = "/oauth/token"
+MOCK_USERNAME = "bench"
+MOCK_PASSWORD = "bench"
+
+
+def fake_cpf(i: int) -> str:
+    """i-ésimo CPF sintético, com dígitos verificadores válidos"""
+    return complete_cpf(f"{100000000 + i:09d}")
+
+
+def fake_payload(cpf: str) -> list:
+    seed = int(cpf[-4:]) if cpf[-4:].isdigit() else 0
+    return [
+        {
+            "nomFuncionario": f"SERVIDOR {cpf} ",
+            "numMatricula": 300000000 + seed,
+            "nomCargo": " PROFESSOR ",
+            "nomLotacao": " SEDUC ",
+            "nomClassificacao": " EFETIVO ",
+            "margemDisponivel": round((seed % 97) * 10.5, 2),
+            "margemCartaoDisponivel": 0.0,
+            "margemCartaoBeneficio": float(seed % 3),
+            "situacao": " ATIVO ",
+            "isPensionista": "N",
+        }
+    ]
+
+
+class ServerThrottle:
+    """Janela de 1s que devolve 429 acima de `max_rps` (0 = sem limite)"""
+
+    def __init__(self, max_rps: float = 0):
+        self.max_rps = max_rps
+        self._lock = threading.Lock()
+        self._window = 0
+        self._count = 0
+
+    def allow(self) -> bool:
+        if not self.max_rps:
+            return True
+        with self._lock:
+            window = int(time.monotonic())
+            if window != self._window:
+                self._window, self._count = window, 0
+            self._count += 1
+            return self._count <= self.max_rps
+
+
+class MockRoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # mantém keep-alive como o portal
+    disable_nagle_algorithm = True  # evita atraso de ACK com keep-alive
+    latency = 0.05
+    throttle = ServerThrottle()
+    token_ttl = 1800
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        query = parse_qs(urlparse(self.path).query)
+        cpf = query.get("numCpf", ["00000000000"])[0]
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            self._send_json(401, {"error": "unauthorized"})
+            return
+        if not self.throttle.allow():
+            self._send_json(429, {"error": "too many requests"})
+            return
+        self._send_json(200, fake_payload(cpf))
+
+
+    def do_POST(self):
+        """Troca usuário/senha por um bearer, como o oauth/token do portal"""
+        if urlparse(self.path).path != TOKEN_PATH:
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length", "0"))
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        username = form.get("username", [""])[0]
+        password = form.get("password", [""])[0]
+        if form.get("grant_type", [""])[0] != "password" or (
+            username,
+            password,
+        ) != (MOCK_USERNAME, MOCK_PASSWORD):
+            self._send_json(400, {"error": "invalid_grant"})
+            return
+        self._send_json(
+            200,
+            {
+                "access_token": f"mock-{uuid.uuid4().hex}",
+                "token_type": "bearer",
+                "expires_in": self.token_ttl,
+            },
+        )
+
+
+def token_url(server) -> str:
+    host, port = server.server_address
+    return f"http://{host}:{port}{TOKEN_PATH}"
+
+
+def serve_in_background(
+    port: int = 0, latency: float = 0.05, max_rps: float = 0
+):
+    """Sobe o servidor em uma thread e retorna (server, route_template)"""
+    handler = type(
+        "Handler",
+        (MockRoHandler,),
+        {"latency": latency, "throttle": ServerThrottle(max_rps)},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    route = f"http://{host}:{port}{ROUTE_PATH}?numCpf={{cpf}}"
+    return server, route
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-rps", type=float, default=0)
+    args = parser.parse_args()
+
+    server, route = serve_in_background(
+        args.port, args.latency, args.max_rps
+    )
+    print(f"ROUTE_RO={route}")
+    print(f"OAUTH_TOKEN_URL={token_url(server)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
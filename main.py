@@ -1,35 +1,220 @@
+import argparse
 import time
+from typing import Iterable
+
 from src.api import ExtractTransformLoad
+from src.core.http_client import RoHttpClient
+from src.core.retry import RetryScheduler
+from src.database.dead_letter import move_to_dead_letter
+from src.database.work_queue import WorkQueue
+from src.database.writer import BulkResultWriter
 from src.log.logger import setup_logger
 
 logger = setup_logger()
 
 
-def main():
-    a = ExtractTransformLoad()
+def parse_args():
+    parser = argparse.ArgumentParser(description="ETL de consulta RO")
+    parser.add_argument(
+        "--mode",
+        choices=["sync", "async", "process", "pipeline"],
+        default="sync",
+        help=(
+            "sync: um CPF por vez; async: várias consultas em voo; "
+            "process: async em vários processos, um shard de CPFs cada; "
+            "pipeline: threads de consulta, transformação e gravação "
+            "ligadas por filas"
+        ),
+    )
+    parser.add_argument(
+        "--source",
+        choices=["pending", "queue"],
+        default="pending",
+        help=(
+            "pending: pagina os CPFs com has_filter = false; queue: reserva "
+            "lotes com SKIP LOCKED para rodar vários workers/máquinas"
+        ),
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="consultas simultâneas no modo async (padrão: ETL_CONCURRENCY)",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=None,
+        help="processos no modo process (padrão: ETL_PROCESSES)",
+    )
+    parser.add_argument(
+        "--fetchers",
+        type=int,
+        default=None,
+        help="threads de consulta no modo pipeline (PIPELINE_FETCHERS)",
+    )
+    parser.add_argument(
+        "--transformers",
+        type=int,
+        default=None,
+        help="threads de transformação no modo pipeline",
+    )
+    return parser.parse_args()
+
+
+def work_source(a: ExtractTransformLoad, source: str) -> Iterable[str]:
+    if source == "queue":
+        a.use_work_queue(WorkQueue())
+        return a.work_queue.iter_claimed()
+    return a.iter_pending_cpfs()
+
+
+def main_async(concurrency: int = None, source: str = "pending"):
+    from src.async_api import DEFAULT_CONCURRENCY, AsyncExtractTransformLoad
+
+    writer = BulkResultWriter()
+    a = AsyncExtractTransformLoad(
+        concurrency=concurrency or DEFAULT_CONCURRENCY, writer=writer
+    )
+    a.load_token()
+    try:
+        a.run_etl(work_source(a, source))
+    finally:
+        a.close()
+        writer.close()
+
+
+def main_processes(
+    processes: int = None, concurrency: int = None, source: str = "pending"
+):
+    from src.async_api import DEFAULT_CONCURRENCY
+    from src.process_runner import ETL_PROCESSES, ShardedRunner
+
+    runner = ShardedRunner(
+        processes=processes or ETL_PROCESSES,
+        concurrency=concurrency or DEFAULT_CONCURRENCY,
+        source=source,
+    )
+    runner.run()
+
+
+def main_pipeline(
+    source: str = "pending", fetchers: int = None, transformers: int = None
+):
+    from src.pipeline import (
+        PIPELINE_FETCHERS,
+        PIPELINE_TRANSFORMERS,
+        StagedPipeline,
+    )
+
+    fetchers = fetchers or PIPELINE_FETCHERS
+    writer = BulkResultWriter()
+    a = ExtractTransformLoad(
+        http_client=RoHttpClient(workers=fetchers), writer=writer
+    )
+    a.load_token()
+    a.http.warm_up(a.base_url)
+    pipeline = StagedPipeline(
+        a,
+        writer,
+        fetchers=fetchers,
+        transformers=transformers or PIPELINE_TRANSFORMERS,
+    )
+    try:
+        pipeline.run(work_source(a, source))
+    finally:
+        a.close()
+        writer.close()
+
+
+def main(source: str = "pending"):
+    writer = BulkResultWriter()
+    a = ExtractTransformLoad(
+        http_client=RoHttpClient(workers=1), writer=writer
+    )
     a.load_token()  # token inicial
-    cpfs = a.cpfs_database()
+    a.http.warm_up(a.base_url)
+    cpfs = work_source(a, source)
 
-    i = 0
-    while i < len(cpfs):  # loop contínuo
-        cpf = cpfs[i]
-        try:
-            time.sleep(5)
-            data = a.get_request(cpf)
+    try:
+        process_loop(a, cpfs)
+    finally:
+        a.close()
+        writer.close()
+
+
+def process_loop(
+    a: ExtractTransformLoad,
+    cpfs: Iterable[str],
+    scheduler: RetryScheduler = None,
+):
+    """Consulta os CPFs; os que falham esperam no RetryScheduler.
+
+    Um CPF com erro não segura o resto: vai para a fila de espera com
+    backoff e volta quando vencer. Depois de RETRY_MAX_ATTEMPTS falhas
+    vai para spreed.ro_dead_letter com o último status e erro. Com
+    --source queue, CPFs que não chegam ao fim (dead-letter que falhou,
+    ou ainda esperando quando o loop é interrompido) voltam à fila.
+    """
+    if scheduler is None:
+        scheduler = RetryScheduler()
+    pending = iter(cpfs)  # páginas sob demanda do spreed.ro
+    try:
+        _drain(a, pending, scheduler)
+    finally:
+        a.release_claims(scheduler.waiting())
+    logger.info(f"Fila de novas tentativas: {scheduler.stats()}")
 
-            # Só avança se processou o CPF sem erro
-            if data is not None:
-                i += 1
 
+def _drain(a: ExtractTransformLoad, pending, scheduler: RetryScheduler):
+    exhausted = False
+    while True:
+        cpf = scheduler.pop_due()
+        if cpf is None and not exhausted:
+            cpf = next(pending, None)
+            exhausted = cpf is None
+        if cpf is None:
+            if exhausted and not scheduler:
+                break
+            # só restam CPFs esperando o backoff
+            time.sleep(min(scheduler.next_due_in(), 1.0))
+            continue
+
+        try:
+            # o ritmo é controlado pelo AdaptiveRateLimiter do ETL
+            data = a.get_request(cpf)
         except ValueError as e:
-            # Caso "Token not loaded"
+            # Caso "Token not loaded": não conta como tentativa
             logger.warning(f"Token ausente. Tentando recarregar: {e}")
             a.load_token()
-
+            scheduler.defer(cpf)
+            continue
         except Exception as e:
             logger.error(f"Erro inesperado no CPF {cpf}: {e}")
-            i += 1  # pula esse CPF problemático e segue em frente
+            status, error = None, repr(e)
+            data = None
+        else:
+            if data is not None:
+                scheduler.succeed(cpf)
+                continue
+            status, error = a.last_failure()
+
+        dead = scheduler.fail(cpf, status, error)
+        if dead is not None:
+            try:
+                move_to_dead_letter(dead, owner=a.owner)
+            except Exception as e:
+                logger.error(f"Erro gravando dead-letter de {cpf}: {e}")
+                a.release_claims([cpf])
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.mode == "pipeline":
+        main_pipeline(args.source, args.fetchers, args.transformers)
+    elif args.mode == "process":
+        main_processes(args.processes, args.concurrency, args.source)
+    elif args.mode == "async":
+        main_async(args.concurrency, args.source)
+    else:
+        main(args.source)
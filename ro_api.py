@@ -34,6 +34,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
 from src.database.schemas import ResultSearchRo
+from src.core.http_client import RoHttpClient
 from src.log.logger import LoggerWebDriverManager, setup_logger
 from src.models.ro import ServidorSchema
 from src.utils.helpers import WaitHelper
@@ -175,6 +176,7 @@ class ExtractTransformLoad:
     def __init__(self):
         self.base_url = os.getenv("ROUTE_RO")  # Ex.: "https://consignacao.sistemas.ro.gov.br/servidor/buscarPorMatriculaCpfSequencia?numCpf={cpf}"
         self.token = None
+        self.http = RoHttpClient(workers=1)
 
     def load_token(self) -> str:
         token_path = "token_response.json"
@@ -189,6 +191,7 @@ class ExtractTransformLoad:
             raise KeyError("Token file does not contain 'access_token'")
 
         self.token = token_data["access_token"]
+        self.http.set_token(self.token)
         return self.token
 
     def cpfs_database(self):
@@ -227,11 +230,7 @@ class ExtractTransformLoad:
 
         url = self.base_url.format(cpf=cpf)  # Substitui {cpf} na rota
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
-                "Authorization": f"Bearer {self.token}",
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = self.http.get(url)
 
             if response.status_code == 200:
                 data = response.json()
@@ -256,6 +255,7 @@ class ExtractTransformLoad:
 if __name__ == "__main__":
     a = ExtractTransformLoad()
     a.load_token()
+    a.http.warm_up(a.base_url)
 
     cpfs = a.cpfs_database()
     for cpf in cpfs:
@@ -1,108 +1,104 @@
 import os
-import json
+import time
 import requests
-import threading
 import logging
 
 # Configuração do logger
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-from decimal import Decimal
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 from src.database.schemas import SearchRo  
-from src.database.schemas import ResultSearchRo, SessionLocal 
-from src.core.scraper_token import ScrapePoolExecute
+from src.database.schemas import SessionLocal
+from src.core.transform import build_result_rows
+from src.database.bulk import upsert_results
+from src.core.http_client import RoHttpClient
+from src.core.rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from src.core.token_manager import TokenManager
+from src.database.work_queue import WorkQueue, done_values
 from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 
 class ExtractTransformLoad:
-    def __init__(self):
+    def __init__(
+        self,
+        rate_limiter: AdaptiveRateLimiter = None,
+        http_client: RoHttpClient = None,
+    ):
         self.base_url = os.getenv("ROUTE_RO")  # Ex.: "https://consignacao.sistemas.ro.gov.br/..."
         self.token = None
-        self.token_lock = threading.Lock()  # Lock para renovação segura do token
+        # Renovação única (single-flight) para todas as threads
+        self.tokens = TokenManager()
+        self.tokens.subscribe(self._on_token)
+        # Compartilhado entre as threads
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        # Pool de sessões keep-alive compartilhado
+        self.http = http_client or RoHttpClient()
 
 
     def save_result(self, data: list, cpf: str):
-        """Salva o resultado da consulta no banco"""
+        """Salva o resultado da consulta (upsert por cpf + matrícula)"""
         db: Session = SessionLocal()
         try:
-            for item in data:
-                margem_disponivel = str(item.get("margemDisponivel", 0.0))
-                margem_cartao = str(item.get("margemCartaoDisponivel", 0.0))
-                margem_cartao_beneficio = str(item.get("margemCartaoBeneficio", 0.0))
-
-                result = ResultSearchRo(
-                    nome=item.get("nomFuncionario", "").strip(),
-                    matricula=str(item.get("numMatricula", "")),
-                    cpf=cpf,
-                    cargo=item.get("nomCargo", "").strip(),
-                    lotacao=item.get("nomLotacao", "").strip(),
-                    classificacao=item.get("nomClassificacao", "").strip(),
-                    margem_disponivel=margem_disponivel,
-                    margem_cartao=margem_cartao,
-                    margem_cartao_beneficio=margem_cartao_beneficio,
-                    nome_cargo=item.get("nomCargo", "").strip(),
-                    situacao=item.get("situacao", "").strip(),
-                    is_pensionista=item.get("isPensionista", ""),
-                    list_status=True if any([
-                        Decimal(margem_disponivel) > 0,
-                        Decimal(margem_cartao) > 0,
-                        Decimal(margem_cartao_beneficio) > 0
-                    ]) else False
-                )
-                db.add(result)
-
+            rows = build_result_rows(data, cpf)
+            written = upsert_results(db.connection(), rows)
             db.commit()
-            logger.info(f"✅ Resultados do CPF {cpf} salvos com sucesso")
+            logger.info(
+                f"✅ Resultados do CPF {cpf} salvos com sucesso "
+                f"({written}/{len(rows)} alterados)"
+            )
 
         except Exception as e:
             db.rollback()
-            logger.error(f"❌ Erro ao salvar resultados do CPF {cpf}: {str(e)}")
+            logger.error(
+                f"❌ Erro ao salvar resultados do CPF {cpf}: {str(e)}"
+            )
             raise
         finally:
             db.close()
 
 
+    def _on_token(self, access_token: str) -> None:
+        self.token = access_token
+        self.http.set_token(access_token)
+
     def load_token(self) -> str:
         """Carrega o token de autenticação do arquivo JSON."""
-        token_path = "token_response.json"
         try:
-            if not os.path.exists(token_path):
-                raise FileNotFoundError(f"Token file not found: {token_path}")
-            with open(token_path, "r", encoding="utf-8") as f:
-                token_data = json.load(f)
-            if "access_token" not in token_data:
-                raise KeyError("Token file does not contain 'access_token'")
-            self.token = token_data["access_token"]
+            self.tokens.load()
+            self.tokens.start()
             logger.info("Token loaded successfully")
             return self.token
         except Exception as e:
             logger.error(f"Failed to load token: {str(e)}")
             raise
 
-    def renew_token(self) -> None:
-        """Renova o token em caso de erro 401."""
-        with self.token_lock:  # Garante que apenas uma thread renove o token
-            if self.token is not None:  # Verifica se o token já foi renovado por outra thread
-                return
-            try:
-                username = os.getenv("USERNAME_RO")
-                password = os.getenv("PASSWORD_RO")
-                scrape_pool = ScrapePoolExecute(username=username, password=password)
-                scrape_pool.run()
-                self.load_token()  # Recarrega o token após renovação
-                logger.info("Token renewed successfully")
-            except Exception as e:
-                logger.error(f"Failed to renew token: {str(e)}")
-                raise
+    def renew_token(self, stale_token: str) -> None:
+        """Renova o token em caso de erro 401.
+
+        Threads que recebem 401 com o mesmo token esperam um único login;
+        se o token já foi trocado por outra thread, só segue com o novo.
+        """
+        try:
+            self.tokens.refresh(stale_token=stale_token)
+            logger.info("Token renewed successfully")
+        except Exception as e:
+            logger.error(f"Failed to renew token: {str(e)}")
+            raise
 
     def cpfs_database(self) -> List[str]:
         """Extrai CPFs do banco de dados."""
         db = SessionLocal()
         try:
-            stmt = select(SearchRo.cpf).where(SearchRo.has_filter.__eq__(False))
+            stmt = select(SearchRo.cpf).where(
+                SearchRo.has_filter.__eq__(False)
+            )
             cpfs = db.scalars(stmt).all()
             logger.info(f"Retrieved {len(cpfs)} CPFs from database")
             return cpfs
@@ -112,6 +108,27 @@ class ExtractTransformLoad:
         finally:
             db.close()
 
+    def iter_pending_cpfs(self, page_size: int = 1000) -> Iterator[str]:
+        """Gera CPFs pendentes por keyset pagination em spreed.ro.id."""
+        last_id = 0
+        while True:
+            with SessionLocal() as db:
+                stmt = (
+                    select(SearchRo.id, SearchRo.cpf)
+                    .where(
+                        SearchRo.has_filter.__eq__(False),
+                        SearchRo.id > last_id,
+                    )
+                    .order_by(SearchRo.id)
+                    .limit(page_size)
+                )
+                page = db.execute(stmt).all()
+            if not page:
+                return
+            last_id = page[-1].id
+            for row in page:
+                yield row.cpf
+
     def update_has_filter_cpf(self, cpf: str, db: Session) -> None:
         """Atualiza o campo has_filter no banco para um CPF."""
         try:
@@ -119,7 +136,7 @@ class ExtractTransformLoad:
             stmt = (
                 update(SearchRo)
                 .where(SearchRo.cpf == cpf_str)
-                .values(has_filter=True)
+                .values(**done_values())
             )
             db.execute(stmt)
             db.commit()
@@ -128,6 +145,22 @@ class ExtractTransformLoad:
             logger.error(f"Error updating has_filter for CPF {cpf}: {str(e)}")
             raise
 
+    def _limited_get(self, url: str) -> requests.Response:
+        """GET pelo pool keep-alive respeitando o rate limiter."""
+        self.rate_limiter.acquire()
+        started = time.perf_counter()
+        try:
+            response = self.http.get(url)
+        except requests.exceptions.RequestException:
+            self.rate_limiter.record(None, time.perf_counter() - started)
+            raise
+        self.rate_limiter.record(
+            response.status_code,
+            time.perf_counter() - started,
+            parse_retry_after(response.headers.get("Retry-After")),
+        )
+        return response
+
     def get_request(self, cpf: str) -> Optional[dict]:
         """Faz requisição para a API usando CPF."""
         if not self.token:
@@ -136,11 +169,8 @@ class ExtractTransformLoad:
         url = self.base_url.format(cpf=cpf)
         db = SessionLocal()  # Cada thread tem sua própria sessão
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
-                "Authorization": f"Bearer {self.token}",
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+            token = self.token
+            response = self._limited_get(url)
 
             if response.status_code == 200:
                 data = response.json()
@@ -151,19 +181,28 @@ class ExtractTransformLoad:
                     self.save_result(data, cpf)
                     
             elif response.status_code == 401:
-                logger.warning(f"Token expired for CPF {cpf}, attempting to renew")
-                self.renew_token()
-                headers["Authorization"] = f"Bearer {self.token}"
-                response = requests.get(url, headers=headers, timeout=10)
+                logger.warning(
+                    f"Token expired for CPF {cpf}, attempting to renew"
+                )
+                self.renew_token(token)
+                response = self._limited_get(url)
                 if response.status_code == 200:
                     data = response.json()
-                    logger.info(f"✅ Dados do CPF {cpf} capturados com sucesso após renovação do token")
+                    logger.info(
+                        f"✅ Dados do CPF {cpf} capturados com sucesso "
+                        f"após renovação do token"
+                    )
                     self.update_has_filter_cpf(cpf, db)
                     return data
                 else:
-                    logger.error(f"Request failed for CPF {cpf} after token renewal: {response.status_code}")
+                    logger.error(
+                        f"Request failed for CPF {cpf} after token "
+                        f"renewal: {response.status_code}"
+                    )
             else:
-                logger.error(f"Request failed for CPF {cpf}: {response.status_code}")
+                logger.error(
+                    f"Request failed for CPF {cpf}: {response.status_code}"
+                )
         except requests.exceptions.RequestException as e:
             logger.error(f"Request failed for CPF {cpf}: {str(e)}")
         except Exception as e:
@@ -172,25 +211,42 @@ class ExtractTransformLoad:
             db.close()
         return None
 
-    def run_etl(self, max_workers: int = 5) -> None:
-        """Executa o processo ETL com múltiplas threads."""
+    def run_etl(
+        self, max_workers: int = 5, cpfs: Iterable[str] = None
+    ) -> None:
+        """Executa o processo ETL com múltiplas threads.
+
+        `cpfs` permite usar a WorkQueue (SKIP LOCKED) ao lado do main.py.
+        """
+        if self.http.workers < max_workers:
+            # Uma sessão por thread
+            self.http = RoHttpClient(workers=max_workers)
         self.load_token()
-        cpfs = self.cpfs_database()
-        logger.info(f"Starting ETL process for {len(cpfs)} CPFs with {max_workers} threads")
+        self.http.warm_up(self.base_url)
+        logger.info(f"Starting ETL process with {max_workers} threads")
 
+        # Mantém no máximo 2x max_workers CPFs em voo enquanto lê as páginas
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_cpf = {executor.submit(self.get_request, cpf): cpf for cpf in cpfs}
+            future_to_cpf = {}
+            for cpf in cpfs if cpfs is not None else self.iter_pending_cpfs():
+                future_to_cpf[executor.submit(self.get_request, cpf)] = cpf
+                if len(future_to_cpf) >= max_workers * 2:
+                    done, _ = wait(future_to_cpf, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._log_future(future, future_to_cpf.pop(future))
             for future in as_completed(future_to_cpf):
-                cpf = future_to_cpf[future]
-                try:
-                    result = future.result()
-                    if result:
-                        logger.info(f"Processed CPF {cpf} successfully")
-                    else:
-                        logger.warning(f"No data returned for CPF {cpf}")
-                except Exception as e:
-                    logger.error(f"Error processing CPF {cpf}: {str(e)}")
+                self._log_future(future, future_to_cpf[future])
+
+    def _log_future(self, future, cpf: str) -> None:
+        try:
+            result = future.result()
+            if result:
+                logger.info(f"Processed CPF {cpf} successfully")
+            else:
+                logger.warning(f"No data returned for CPF {cpf}")
+        except Exception as e:
+            logger.error(f"Error processing CPF {cpf}: {str(e)}")
 
 if __name__ == "__main__":
     etl = ExtractTransformLoad()
-    etl.run_etl(max_workers=5)
\ No newline at end of file
+    etl.run_etl(max_workers=5, cpfs=WorkQueue().iter_claimed())
\ No newline at end of file
@@ -1,16 +1,30 @@
 
 import os
-import json
+import threading
+import time
 import requests
+from typing import Iterator
 from sqlalchemy.orm import Session
-from decimal import Decimal
-from sqlalchemy import select, update
-from sqlalchemy import select, update
+from sqlalchemy import func, select, update
 from dotenv import load_dotenv
 
-from src.core.scraper_token import ScrapePoolExecute
+from src.core.archive import default_archive
+from src.core.cache import ResponseCache, default_response_cache
+from src.core.http_client import RoHttpClient
+from src.core.rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from src.core.token_manager import TokenManager
+from src.core.transform import build_result_rows
+from src.database.bulk import upsert_results
+from src.database.work_queue import (
+    WorkQueue,
+    done_values,
+    finished_by,
+    invalid_values,
+)
+from src.database.writer import BulkResultWriter
 from src.log.logger import LoggerWebDriverManager, setup_logger
-from src.database.schemas import ResultSearchRo, SessionLocal, SearchRo
+from src.database.schemas import SessionLocal, SearchRo
+from src.utils.cpf import is_valid_cpf
 
 
 
@@ -20,24 +34,61 @@ load_dotenv()
 logger = setup_logger()
 driver_logger = LoggerWebDriverManager(logger=logger)
 
+PENDING_PAGE_SIZE = int(os.getenv("PENDING_PAGE_SIZE", "1000"))
+
+
+def shard_of(cpf_column, shards: int):
+    """Shard determinístico de um CPF: hashtext(cpf) positivo módulo N"""
+    return func.mod(func.hashtext(cpf_column).op("&")(0x7FFFFFFF), shards)
+
+
 class ExtractTransformLoad:
-    def __init__(self):
+    def __init__(
+        self,
+        rate_limiter: AdaptiveRateLimiter = None,
+        http_client: RoHttpClient = None,
+        writer: BulkResultWriter = None,
+        token_manager: TokenManager = None,
+        cache: ResponseCache = None,
+    ):
         self.base_url = os.getenv("ROUTE_RO")
+        # compartilhados por todos os workers desta instância
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.http = http_client or RoHttpClient()
+        # sem writer, cada CPF é gravado em sua própria transação
+        self.writer = writer
+        # respostas recentes em disco; None quando RESPONSE_CACHE_TTL=0
+        self.cache = cache or default_response_cache()
+        # cópia crua e compactada de cada resposta, gravada em segundo
+        # plano; None quando RESPONSE_ARCHIVE_DIR está vazio
+        self.archive = default_archive()
+        # última falha de fetch_cpf, por thread (status HTTP, erro)
+        self._failure = threading.local()
         self.token = None
+        # fila de onde vêm os CPFs no --source queue (ver use_work_queue)
+        self.work_queue: WorkQueue = None
+        # renova o token antes de vencer e repassa para o pool HTTP
+        self.tokens = token_manager or TokenManager()
+        self.tokens.subscribe(self._on_token)
 
-    def load_token(self) -> str:
-        token_path = "token_response.json"
-
-        if not os.path.exists(token_path):
-            raise FileNotFoundError(f"Token file not found: {token_path}")
+    @property
+    def token(self) -> str:
+        return self._token
 
-        with open(token_path, "r", encoding="utf-8") as f:
-            token_data = json.load(f)
+    @token.setter
+    def token(self, value: str):
+        self._token = value
+        if value:
+            self.http.set_token(value)
 
-        if "access_token" not in token_data:
-            raise KeyError("Token file does not contain 'access_token'")
+    def _on_token(self, access_token: str):
+        self.token = access_token
 
-        self.token = token_data["access_token"]
+    def load_token(self) -> str:
+        """Carrega o token_response.json e liga a renovação automática"""
+        info = self.tokens.load()
+        self.tokens.start()
+        logger.info(f"Token carregado ({info!r})")
         return self.token
     
     def _format_cpf(self, cpf: str) -> str:
@@ -57,14 +108,56 @@ class ExtractTransformLoad:
             driver_logger.logger.error(f"Error cpfs_database: {str(e)}")
             raise
     
+    def iter_pending_cpfs(
+        self,
+        page_size: int = PENDING_PAGE_SIZE,
+        shard: int = None,
+        shards: int = 1,
+    ) -> Iterator[str]:
+        """Gera os CPFs pendentes paginando por `id` (keyset pagination).
+
+        Cada página usa uma sessão curta, então o processamento começa na
+        primeira página e a memória não cresce com o tamanho do backlog.
+        Com `shard`/`shards`, só devolve os CPFs do shard pedido.
+        """
+        last_id = 0
+        while True:
+            try:
+                with SessionLocal() as db:
+                    stmt = (
+                        select(SearchRo.id, SearchRo.cpf)
+                        .where(
+                            SearchRo.has_filter.__eq__(False),
+                            SearchRo.id > last_id,
+                        )
+                        .order_by(SearchRo.id)
+                        .limit(page_size)
+                    )
+                    if shard is not None:
+                        stmt = stmt.where(
+                            shard_of(SearchRo.cpf, shards) == shard
+                        )
+                    page = db.execute(stmt).all()
+            except Exception as e:
+                driver_logger.logger.error(
+                    f"Error iter_pending_cpfs: {str(e)}"
+                )
+                raise
+
+            if not page:
+                return
+            last_id = page[-1].id
+            for row in page:
+                yield row.cpf
+
     def update_has_filter_cpf(self, cpf: str):
         try:
             db = SessionLocal()
             cpf_str = cpf.replace(".", "").replace("-", "")
             stmt = (
                 update(SearchRo)
-                .where(SearchRo.cpf == cpf_str)
-                .values(has_filter=True)
+                .where(finished_by([cpf_str], self.owner))
+                .values(**done_values())
             )
             db.execute(stmt)
             db.commit()
@@ -79,34 +172,15 @@ class ExtractTransformLoad:
         """Salva o resultado da consulta no banco"""
         db: Session = SessionLocal()
         try:
-            for item in data:
-                margem_disponivel = str(item.get("margemDisponivel", 0.0))
-                margem_cartao = str(item.get("margemCartaoDisponivel", 0.0))
-                margem_cartao_beneficio = str(item.get("margemCartaoBeneficio", 0.0))
-
-                result = ResultSearchRo(
-                    nome=item.get("nomFuncionario", "").strip(),
-                    matricula=str(item.get("numMatricula", "")),
-                    cpf=cpf,
-                    cargo=item.get("nomCargo", "").strip(),
-                    lotacao=item.get("nomLotacao", "").strip(),
-                    classificacao=item.get("nomClassificacao", "").strip(),
-                    margem_disponivel=margem_disponivel,
-                    margem_cartao=margem_cartao,
-                    margem_cartao_beneficio=margem_cartao_beneficio,
-                    nome_cargo=item.get("nomCargo", "").strip(),
-                    situacao=item.get("situacao", "").strip(),
-                    is_pensionista=item.get("isPensionista", ""),
-                    list_status=True if any([
-                        Decimal(margem_disponivel) > 0,
-                        Decimal(margem_cartao) > 0,
-                        Decimal(margem_cartao_beneficio) > 0
-                    ]) else False
-                )
-                db.add(result)
+            # upsert por (cpf, matricula): repetir um CPF não duplica linhas
+            rows = build_result_rows(data, cpf)
+            written = upsert_results(db.connection(), rows)
 
             db.commit()
-            driver_logger.logger.info(f"✅ Resultados do CPF {cpf} salvos com sucesso")
+            driver_logger.logger.info(
+                f"✅ Resultados do CPF {cpf} salvos com sucesso "
+                f"({written}/{len(rows)} alterados)"
+            )
 
         except Exception as e:
             db.rollback()
@@ -115,51 +189,167 @@ class ExtractTransformLoad:
         finally:
             db.close()
 
-    def get_request(self, cpf: str):
-        if not self.token:
-            raise ValueError("Token not loaded. Call 'load_token()' first.")
+    def renew_token(self, stale_token: str = None) -> str:
+        """Renovação imediata, para quando o portal recusa o token atual.
 
-        url = self.base_url.format(cpf=self._format_cpf(cpf))
+        Com `stale_token`, não renova se outro worker já trocou o token;
+        sem ele, usa o token atual.
+        """
+        logger.warning("⚠️ Token recusado, renovando antes do vencimento...")
+        stale_token = stale_token or self.token
+        return self.tokens.refresh(stale_token=stale_token).access_token
+
+    def keep_response(self, cpf: str, data):
+        """Guarda a resposta vinda da rede no cache e no arquivo"""
+        if self.cache:
+            self.cache.put(cpf, data)
+        if self.archive:
+            self.archive.append(cpf, data)
+
+    def close(self):
+        """Para a renovação do token e fecha cache e arquivo"""
+        self.tokens.stop()
+        if self.archive:
+            self.archive.close()
+        if self.cache:
+            logger.info(f"Cache de respostas: {self.cache.stats()}")
+            self.cache.close()
+
+    def use_work_queue(self, queue: WorkQueue):
+        """CPFs vêm de `queue`: conclusões passam a exigir a reserva"""
+        self.work_queue = queue
+        if self.writer is not None:
+            self.writer.owner = queue.worker_id
+
+    @property
+    def owner(self):
+        """Worker da WorkQueue dono das reservas, ou None"""
+        return self.work_queue.worker_id if self.work_queue else None
+
+    def release_claims(self, cpfs) -> int:
+        """Devolve à fila CPFs reservados que não foram concluídos.
+
+        Sem WorkQueue (CPFs paginados do spreed.ro) não há o que devolver.
+        """
+        cpfs = list(cpfs)
+        if self.work_queue is None or not cpfs:
+            return 0
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3",
-                "Authorization": f"Bearer {self.token}",
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+            released = self.work_queue.release(cpfs)
+        except Exception as e:
+            logger.error(f"Erro devolvendo {len(cpfs)} CPFs à fila: {e}")
+            return 0
+        logger.info(f"{released} CPFs não concluídos devolvidos à fila")
+        return released
 
-            if response.status_code == 200:
-                data = response.json()
-                print(f"\n✅ Dados do CPF {cpf} capturados com sucesso:")
-                # print(json.dumps(data, indent=4, ensure_ascii=False))
-                self.update_has_filter_cpf(cpf)
+    def mark_invalid(self, cpf: str):
+        """Tira da fila um CPF com dígito verificador errado"""
+        if self.writer is not None:
+            self.writer.add_invalid(cpf)
+            return
+        with SessionLocal() as db:
+            db.execute(
+                update(SearchRo)
+                .where(finished_by([cpf], self.owner))
+                .values(**invalid_values())
+            )
+            db.commit()
 
-                if isinstance(data, list) and len(data) > 0:
-                    self.save_result(data, cpf)
+    def reject_invalid(self, cpf: str) -> bool:
+        """True (e marca o CPF) quando ele não passa no dígito verificador.
 
-                return data
+        A carga já marca os inválidos; isto cobre linhas antigas e evita
+        gastar uma vaga do rate limiter com uma consulta perdida.
+        """
+        if is_valid_cpf(cpf):
+            return False
+        logger.warning(f"CPF {cpf} inválido; ignorado sem consulta")
+        self.mark_invalid(cpf)
+        return True
 
-            elif response.status_code == 401:
-                logger.warning("⚠️ Token expirado, iniciando renovação com Selenium...")
+    def handle_result(self, cpf: str, data):
+        """Marca o CPF como consultado e persiste o retorno da API"""
+        if self.writer is not None:
+            # transformado em lote no flush do writer
+            self.writer.add_raw(cpf, data)
+            return
 
-                username = os.getenv("USERNAME_RO")
-                password = os.getenv("PASSWORD_RO")
-                scrape_pool = ScrapePoolExecute(username=username, password=password)
+        self.update_has_filter_cpf(cpf)
 
-                new_token = scrape_pool.run()
-                if not new_token:
-                    raise RuntimeError("Falha ao renovar token com Selenium.")
+        if isinstance(data, list) and len(data) > 0:
+            self.save_result(data, cpf)
 
-                self.token = new_token  # atualiza token
-                logger.info("🔄 Token atualizado com sucesso, repetindo requisição...")
-                return self.get_request(cpf)  # repete a requisição do mesmo CPF
+    def _record_failure(self, status: int = None, error: str = None):
+        self._failure.last = (status, error)
 
-            else:
-                logger.error(f"❌ Erro {response.status_code} para CPF {cpf}")
-                return None
+    def last_failure(self) -> tuple:
+        """(status HTTP ou None, erro) da última falha nesta thread"""
+        return getattr(self._failure, "last", (None, None))
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request falhou para CPF {cpf}: {e}")
+    def get_request(self, cpf: str):
+        if self.reject_invalid(cpf):
+            return []  # resolvido: nada a consultar
+        data = self.fetch_cpf(cpf)
+        if data is None:
             return None
+        try:
+            self.handle_result(cpf, data)
         except Exception as e:
             logger.error(f"Erro inesperado para CPF {cpf}: {e}")
+            self._record_failure(error=f"handle_result: {e!r}")
             return None
+        return data
+
+    def fetch_cpf(self, cpf: str):
+        """JSON do CPF (do cache ou do ROUTE_RO), sem gravar no banco"""
+        if not self.token:
+            raise ValueError("Token not loaded. Call 'load_token()' first.")
+        self._failure.last = (None, None)
+
+        cached = self.cache.get(cpf) if self.cache else None
+        if cached is not None:
+            return cached
+
+        url = self.base_url.format(cpf=self._format_cpf(cpf))
+        for attempt in range(2):  # uma nova tentativa após renovar o token
+            token = self.token
+            self.rate_limiter.acquire()
+            started = time.perf_counter()
+            try:
+                response = self.http.get(url)
+                self.rate_limiter.record(
+                    response.status_code,
+                    time.perf_counter() - started,
+                    parse_retry_after(response.headers.get("Retry-After")),
+                )
+
+                if response.status_code == 200:
+                    data = response.json()
+                    print(f"\n✅ Dados do CPF {cpf} capturados com sucesso:")
+                    self.keep_response(cpf, data)
+                    return data
+
+                elif response.status_code == 401 and attempt == 0:
+                    # várias threads com o mesmo token viram um só login
+                    self.renew_token(token)
+                    logger.info("🔄 Repetindo requisição...")
+                    continue
+
+                else:
+                    logger.error(
+                        f"❌ Erro {response.status_code} para CPF {cpf}"
+                    )
+                    self._record_failure(
+                        response.status_code, response.text[:500]
+                    )
+                    return None
+
+            except requests.exceptions.RequestException as e:
+                self.rate_limiter.record(None, time.perf_counter() - started)
+                logger.error(f"Request falhou para CPF {cpf}: {e}")
+                self._record_failure(error=repr(e))
+                return None
+            except Exception as e:
+                logger.error(f"Erro inesperado para CPF {cpf}: {e}")
+                self._record_failure(error=repr(e))
+                return None
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import time
+from http import HTTPStatus
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from src.api import ExtractTransformLoad, logger
+from src.core.rate_limiter import AdaptiveRateLimiter, parse_retry_after
+from src.database.writer import BulkResultWriter
+from src.utils.cpf import is_valid_cpf
+
+DEFAULT_CONCURRENCY = int(os.getenv("ETL_CONCURRENCY", "50"))
+
+
+class AsyncExtractTransformLoad(ExtractTransformLoad):
+    """ETL em asyncio: mantém `concurrency` consultas em voo no ROUTE_RO.
+
+    As respostas prontas seguem para o mesmo `handle_result` da versão
+    síncrona (has_filter + save_result), executado em threads para não
+    bloquear o event loop.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: float = 10,
+        rate_limiter: AdaptiveRateLimiter = None,
+        writer: BulkResultWriter = None,
+    ):
+        super().__init__(rate_limiter=rate_limiter, writer=writer)
+        self.concurrency = concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.processed = 0
+        self.failed = 0
+        # falhas desta execução; voltam à fila no fim do run()
+        self.failed_cpfs: list = []
+        self._renew_lock: Optional[asyncio.Lock] = None
+
+    async def _renew_token(self, stale_token: str):
+        """Renova o token uma única vez para todas as tarefas em voo"""
+        async with self._renew_lock:
+            if self.token != stale_token:
+                return  # outra tarefa já renovou
+            # o TokenManager também junta com o refresh em segundo plano
+            await asyncio.to_thread(self.renew_token, stale_token)
+
+    async def fetch(self, session: aiohttp.ClientSession, cpf: str):
+        """Consulta um CPF; retorna o JSON ou None em caso de falha"""
+        url = self.base_url.format(cpf=self._format_cpf(cpf))
+
+        for _ in range(2):  # uma nova tentativa após renovar o token
+            token = self.token
+            await self.rate_limiter.acquire_async()
+            started = time.perf_counter()
+            try:
+                # mesmo dict de headers do RoHttpClient, trocado no lugar
+                async with session.get(
+                    url, headers=self.http.headers
+                ) as response:
+                    retry_after = response.headers.get("Retry-After")
+                    self.rate_limiter.record(
+                        response.status,
+                        time.perf_counter() - started,
+                        parse_retry_after(retry_after),
+                    )
+                    if response.status == HTTPStatus.OK:
+                        return await response.json(content_type=None)
+
+                    if response.status == HTTPStatus.UNAUTHORIZED:
+                        await self._renew_token(token)
+                        continue
+
+                    logger.error(f"❌ Erro {response.status} para CPF {cpf}")
+                    return None
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.rate_limiter.record(None, time.perf_counter() - started)
+                logger.error(f"Request falhou para CPF {cpf}: {e!r}")
+                return None
+
+        logger.error(f"❌ Token recusado após renovação para CPF {cpf}")
+        return None
+
+    async def process(self, session: aiohttp.ClientSession, cpf: str):
+        if not is_valid_cpf(cpf):
+            # pode gravar no banco; fora do event loop
+            await asyncio.to_thread(self.reject_invalid, cpf)
+            return []
+        # leitura local e indexada; não vale o custo de uma thread
+        data = self.cache.get(cpf) if self.cache else None
+        if data is None:
+            data = await self.fetch(session, cpf)
+            if data is None:
+                self.failed += 1
+                self.failed_cpfs.append(cpf)
+                return None
+            if self.cache or self.archive:
+                await asyncio.to_thread(self.keep_response, cpf, data)
+
+        await asyncio.to_thread(self.handle_result, cpf, data)
+        self.processed += 1
+        return data
+
+    async def warm_up(self, session: aiohttp.ClientSession):
+        """Abre as conexões do TCPConnector antes do primeiro CPF"""
+        parts = urlsplit(self.base_url)
+        origin = f"{parts.scheme}://{parts.netloc}/"
+        started = time.perf_counter()
+
+        async def _head():
+            try:
+                async with session.head(origin):
+                    return True
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"Warm-up falhou para {origin}: {e!r}")
+                return False
+
+        warmed = await asyncio.gather(
+            *(_head() for _ in range(self.concurrency))
+        )
+        logger.info(
+            f"Conexões aquecidas: {sum(warmed)}/{self.concurrency} com "
+            f"{origin} em {time.perf_counter() - started:.2f}s"
+        )
+
+    async def _worker(
+        self, session: aiohttp.ClientSession, queue: asyncio.Queue
+    ):
+        while True:
+            cpf = await queue.get()
+            if cpf is None:
+                return
+            try:
+                await self.process(session, cpf)
+            except Exception as e:
+                self.failed += 1
+                self.failed_cpfs.append(cpf)
+                logger.error(f"Erro inesperado no CPF {cpf}: {e}")
+
+    async def run(self, cpfs: Iterable[str]):
+        """Distribui os CPFs entre `concurrency` workers"""
+        if not self.token:
+            raise ValueError("Token not loaded. Call 'load_token()' first.")
+
+        self._renew_lock = asyncio.Lock()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        started = time.perf_counter()
+
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=self.timeout
+        ) as session:
+            await self.warm_up(session)
+            workers = [
+                asyncio.create_task(self._worker(session, queue))
+                for _ in range(self.concurrency)
+            ]
+            # a paginação no spreed.ro (ou o claim da WorkQueue) é
+            # síncrona: cada next() vai para uma thread e não trava o loop
+            it = iter(cpfs)
+            while (cpf := await asyncio.to_thread(next, it, None)) is not None:
+                await queue.put(cpf)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+
+        # devolvidos só agora: soltos na hora, o próximo claim deste mesmo
+        # worker pegaria o CPF de volta e repetiria a falha em seguida
+        await asyncio.to_thread(self.release_claims, self.failed_cpfs)
+        self.failed_cpfs = []
+        elapsed = time.perf_counter() - started
+        total = self.processed + self.failed
+        logger.info(
+            f"Async ETL finalizado: {self.processed} ok, {self.failed} falhas "
+            f"em {elapsed:.1f}s ({total / max(elapsed, 1e-9):.1f} CPF/s)"
+        )
+
+    def run_etl(self, cpfs: Iterable[str]):
+        asyncio.run(self.run(cpfs))
@@ -0,0 +1,197 @@
+"""Arquivo compactado e só de acréscimo das respostas cruas do ROUTE_RO.
+
+    python -m src.core.archive replay [--dir archive] [--batch-size 2000]
+
+Cada resposta vira uma linha JSON (`cpf`, `fetched_at`, `data`) em
+segmentos gzip. O replay relê os segmentos e refaz transformação e carga
+(BulkResultWriter.add_raw, que transforma em lote) sem ir à rede, por
+exemplo depois de mudar a regra do `list_status`.
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from typing import Iterator, Optional, Tuple
+
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+# vazio desliga o arquivo
+RESPONSE_ARCHIVE_DIR = os.getenv("RESPONSE_ARCHIVE_DIR", "archive")
+ARCHIVE_SEGMENT_RECORDS = int(os.getenv("ARCHIVE_SEGMENT_RECORDS", "100000"))
+ARCHIVE_FLUSH_INTERVAL = float(os.getenv("ARCHIVE_FLUSH_INTERVAL", "5"))
+
+SEGMENT_SUFFIX = ".jsonl.gz"
+OPEN_SUFFIX = ".part"
+
+_CLOSE = object()
+
+
+class ResponseArchive:
+    """Grava as respostas em segundo plano, em segmentos gzip.
+
+    `append` só enfileira; uma thread serializa e compacta. O segmento
+    em escrita tem sufixo `.part` e é renomeado ao fechar (a cada
+    `segment_records` respostas ou no `close`). A cada `flush_interval`
+    segundos o gzip é descarregado, então um crash perde no máximo esse
+    intervalo e o replay lê o `.part` até onde estiver íntegro.
+    """
+
+    def __init__(
+        self,
+        directory: str = RESPONSE_ARCHIVE_DIR,
+        segment_records: int = ARCHIVE_SEGMENT_RECORDS,
+        flush_interval: float = ARCHIVE_FLUSH_INTERVAL,
+        max_pending: int = 10000,
+    ):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.flush_interval = flush_interval
+        self.records = 0
+        self.segments = 0
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._file = None
+        self._path: Optional[str] = None
+        self._segment_count = 0
+        self._thread = threading.Thread(
+            target=self._run, name="response-archive", daemon=True
+        )
+        self._thread.start()
+
+    def append(self, cpf: str, data):
+        self._queue.put((cpf, time.time(), data))
+
+    def _open_segment(self):
+        stamp = time.strftime("%Y%m%dT%H%M%S")
+        name = f"responses-{stamp}-{os.getpid()}-{self.segments:05d}"
+        self._path = os.path.join(
+            self.directory, name + SEGMENT_SUFFIX + OPEN_SUFFIX
+        )
+        self._file = gzip.open(self._path, "wb")
+        self._segment_count = 0
+        self.segments += 1
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._path, self._path[: -len(OPEN_SUFFIX)])
+        self._file, self._path = None, None
+
+    def _write(self, record):
+        cpf, fetched_at, data = record
+        if self._file is None:
+            self._open_segment()
+        line = json.dumps(
+            {"cpf": cpf, "fetched_at": fetched_at, "data": data},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        self._file.write(line.encode("utf-8") + b"\n")
+        self.records += 1
+        self._segment_count += 1
+        if self._segment_count >= self.segment_records:
+            self._close_segment()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                record = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                record = None
+
+            if record is _CLOSE:
+                self._close_segment()
+                return
+            try:
+                if record is not None:
+                    self._write(record)
+                if (
+                    self._file is not None
+                    and time.monotonic() - last_flush >= self.flush_interval
+                ):
+                    self._file.flush(zlib.Z_SYNC_FLUSH)
+                    last_flush = time.monotonic()
+            except Exception as e:
+                logger.error(f"Erro gravando arquivo de respostas: {e}")
+
+    def close(self):
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        logger.info(
+            f"Arquivo de respostas: {self.records} respostas em "
+            f"{self.segments} segmento(s) em {self.directory}"
+        )
+
+
+def default_archive() -> Optional[ResponseArchive]:
+    if not RESPONSE_ARCHIVE_DIR:
+        return None
+    return ResponseArchive()
+
+
+def iter_archive(
+    directory: str = RESPONSE_ARCHIVE_DIR,
+) -> Iterator[Tuple[str, float, object]]:
+    """Gera (cpf, fetched_at, data) de todos os segmentos, em ordem.
+
+    Segmentos `.part` (de um processo que caiu) são lidos até o último
+    registro íntegro.
+    """
+    pattern = os.path.join(directory, f"responses-*{SEGMENT_SUFFIX}*")
+    for path in sorted(glob.glob(pattern)):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # linha cortada no fim de um .part
+                    yield record["cpf"], record["fetched_at"], record["data"]
+        except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+            logger.warning(f"Segmento {path} truncado: {e}")
+
+
+def replay(directory: str = RESPONSE_ARCHIVE_DIR, writer=None) -> int:
+    """Refaz transform + load de todas as respostas arquivadas"""
+    from src.database.writer import BulkResultWriter
+
+    writer = writer or BulkResultWriter()
+    started = time.perf_counter()
+    total = 0
+    try:
+        for cpf, _, data in iter_archive(directory):
+            writer.add_raw(cpf, data)
+            total += 1
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    logger.info(
+        f"Replay: {total} respostas em {elapsed:.1f}s "
+        f"({total / max(elapsed, 1e-9):,.0f} respostas/s)"
+    )
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquivo de respostas RO")
+    parser.add_argument("command", choices=["replay"])
+    parser.add_argument("--dir", default=RESPONSE_ARCHIVE_DIR or "archive")
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    from src.database.writer import WRITER_BATCH_SIZE, BulkResultWriter
+
+    writer = BulkResultWriter(batch_size=args.batch_size or WRITER_BATCH_SIZE)
+    replay(args.dir, writer)
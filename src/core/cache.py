@@ -0,0 +1,126 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+RESPONSE_CACHE_PATH = os.getenv(
+    "RESPONSE_CACHE_PATH", "cache/ro_responses.sqlite3"
+)
+# 0 desliga o cache
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+RESPONSE_CACHE_MAX_ENTRIES = int(
+    os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000000")
+)
+
+
+class ResponseCache:
+    """Cache em disco (SQLite) das respostas do ROUTE_RO por CPF.
+
+    Guarda o JSON cru de cada consulta por `ttl` segundos. Entradas
+    vencidas contam como miss; a cada `evict_every` gravações as vencidas
+    são apagadas e, acima de `max_entries`, as mais antigas também.
+    O arquivo pode ser aberto por vários processos ao mesmo tempo (WAL).
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_PATH,
+        ttl: float = RESPONSE_CACHE_TTL,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        evict_every: int = 1000,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evicted = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "cpf TEXT PRIMARY KEY, body TEXT NOT NULL, "
+            "stored_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_responses_stored_at "
+            "ON responses (stored_at)"
+        )
+
+    def get(self, cpf: str):
+        """JSON guardado para o CPF, ou None se não houver ou tiver vencido"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM responses WHERE cpf = ? AND stored_at > ?",
+                (cpf, time.time() - self.ttl),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, cpf: str, data):
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (cpf, body, stored_at) "
+                "VALUES (?, ?, ?)",
+                (cpf, body, time.time()),
+            )
+            self.writes += 1
+            if self.writes % self.evict_every == 0:
+                self._evict()
+
+    def _evict(self):
+        expired = self._conn.execute(
+            "DELETE FROM responses WHERE stored_at <= ?",
+            (time.time() - self.ttl,),
+        ).rowcount
+        (count,) = self._conn.execute(
+            "SELECT count(*) FROM responses"
+        ).fetchone()
+        overflow = max(count - self.max_entries, 0)
+        if overflow:
+            self._conn.execute(
+                "DELETE FROM responses WHERE cpf IN ("
+                "SELECT cpf FROM responses ORDER BY stored_at LIMIT ?)",
+                (overflow,),
+            )
+        self.evicted += expired + overflow
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "writes": self.writes,
+            "evicted": self.evicted,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def default_response_cache() -> Optional[ResponseCache]:
+    """Cache configurado pelo .env; None com RESPONSE_CACHE_TTL=0"""
+    if RESPONSE_CACHE_TTL <= 0:
+        return None
+    return ResponseCache()
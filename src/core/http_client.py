@@ -0,0 +1,123 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+HTTP_POOL_WORKERS = int(os.getenv("HTTP_POOL_WORKERS", "4"))
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+)
+
+
+class RoHttpClient:
+    """Pool thread-safe de `requests.Session` com keep-alive.
+
+    Cada worker pega emprestada uma sessão (com seu próprio pool de
+    conexões) e a devolve ao final da requisição. Todas as sessões
+    apontam para o mesmo dict de headers, então `set_token` troca o
+    Authorization de todas de uma vez, sem remontar headers por CPF.
+    """
+
+    def __init__(
+        self,
+        workers: int = HTTP_POOL_WORKERS,
+        pool_maxsize: int = 2,
+        timeout: float = 10,
+        token: str = None,
+    ):
+        self.workers = workers
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.headers = CaseInsensitiveDict({"User-Agent": USER_AGENT})
+        if token:
+            self.set_token(token)
+
+        # LIFO: reaproveita primeiro a sessão com conexão mais recente
+        self._sessions: queue.LifoQueue = queue.LifoQueue()
+        for _ in range(workers):
+            self._sessions.put(self._new_session())
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.total_latency = 0.0
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers = self.headers
+        return session
+
+    def set_token(self, token: str):
+        """Troca o Bearer token de todas as sessões no lugar"""
+        self.headers["Authorization"] = f"Bearer {token}"
+
+    @contextmanager
+    def session(self):
+        session = self._sessions.get()
+        try:
+            yield session
+        finally:
+            self._sessions.put(session)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        with self.session() as session:
+            started = time.perf_counter()
+            response = session.get(url, **kwargs)
+        with self._stats_lock:
+            self.requests += 1
+            self.total_latency += time.perf_counter() - started
+        return response
+
+    @property
+    def avg_latency(self) -> float:
+        """Latência média por requisição, em segundos"""
+        return self.total_latency / self.requests if self.requests else 0.0
+
+    def warm_up(self, url: str):
+        """Abre uma conexão por sessão antes do primeiro CPF"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}/"
+        sessions = [self._sessions.get() for _ in range(self.workers)]
+        started = time.perf_counter()
+
+        def _head(session: requests.Session) -> bool:
+            try:
+                session.head(origin, timeout=self.timeout)
+                return True
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Warm-up falhou para {origin}: {e}")
+                return False
+
+        try:
+            with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+                warmed = sum(executor.map(_head, sessions))
+        finally:
+            for session in sessions:
+                self._sessions.put(session)
+
+        logger.info(
+            f"HTTP pool aquecido: {warmed}/{len(sessions)} conexões com "
+            f"{origin} em {time.perf_counter() - started:.2f}s"
+        )
+
+    def close(self):
+        while not self._sessions.empty():
+            self._sessions.get_nowait().close()
@@ -0,0 +1,135 @@
+import asyncio
+import os
+import threading
+import time
+from http import HTTPStatus
+from typing import Optional
+
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+RATE_LIMIT_INITIAL = float(os.getenv("RATE_LIMIT_INITIAL", "1.0"))
+RATE_LIMIT_MIN = float(os.getenv("RATE_LIMIT_MIN", "0.2"))
+RATE_LIMIT_MAX = float(os.getenv("RATE_LIMIT_MAX", "50.0"))
+RATE_LIMIT_SLOW_LATENCY = float(os.getenv("RATE_LIMIT_SLOW_LATENCY", "3.0"))
+
+
+class AdaptiveRateLimiter:
+    """Token bucket com ajuste AIMD, compartilhado entre threads e tasks.
+
+    Cada sucesso rápido soma `increase / rate` ao ritmo (cerca de
+    `increase` req/s a mais por segundo); 429, 5xx, erro de rede ou
+    latência acima de `slow_latency` multiplicam o ritmo por `decrease`,
+    no máximo uma vez por `cooldown` segundos.
+    """
+
+    # parâmetros do AIMD (atributos de classe; subclasses podem trocar)
+    increase = 1.0
+    decrease = 0.5
+    slow_latency = RATE_LIMIT_SLOW_LATENCY
+    cooldown = 2.0
+    burst = 1.0
+
+    def __init__(
+        self,
+        initial_rate: float = RATE_LIMIT_INITIAL,
+        min_rate: float = RATE_LIMIT_MIN,
+        max_rate: float = RATE_LIMIT_MAX,
+        report_interval: float = 30.0,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.report_interval = report_interval
+
+        self._lock = threading.Lock()
+        self._rate = min(max(initial_rate, min_rate), max_rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._last_report = self._updated
+        self.successes = 0
+        self.throttled = 0
+
+    @property
+    def current_rate(self) -> float:
+        """Ritmo atual em requisições por segundo"""
+        return self._rate
+
+    def _try_acquire(self) -> float:
+        """Consome uma vaga se houver; senão retorna a espera até a próxima"""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            self._tokens = min(self.burst, self._tokens + elapsed * self._rate)
+
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self._rate
+
+    def acquire(self):
+        # recalcula a espera a cada volta para acompanhar mudanças de ritmo
+        while (delay := self._try_acquire()) > 0:
+            time.sleep(min(delay, 0.25))
+
+    async def acquire_async(self):
+        while (delay := self._try_acquire()) > 0:
+            await asyncio.sleep(min(delay, 0.25))
+
+    def record(
+        self,
+        status_code: Optional[int],
+        latency: float,
+        retry_after: Optional[float] = None,
+    ):
+        """Ajusta o ritmo a partir do resultado de uma requisição.
+
+        `status_code=None` indica falha de rede/timeout.
+        """
+        with self._lock:
+            now = time.monotonic()
+            overloaded = (
+                status_code is None
+                or status_code == HTTPStatus.TOO_MANY_REQUESTS
+                or status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+                or latency > self.slow_latency
+            )
+
+            if overloaded:
+                self.throttled += 1
+                if retry_after:
+                    self._paused_until = max(
+                        self._paused_until, now + retry_after
+                    )
+                if now - self._last_decrease >= self.cooldown:
+                    self._last_decrease = now
+                    self._rate = max(self.min_rate, self._rate * self.decrease)
+                    logger.warning(
+                        f"Rate limiter recuando para {self._rate:.2f} req/s "
+                        f"(status={status_code}, latência={latency:.2f}s)"
+                    )
+            elif status_code < HTTPStatus.BAD_REQUEST:
+                self.successes += 1
+                self._rate = min(
+                    self.max_rate, self._rate + self.increase / self._rate
+                )
+
+            if now - self._last_report >= self.report_interval:
+                self._last_report = now
+                logger.info(
+                    f"Rate limiter: {self._rate:.2f} req/s "
+                    f"({self.successes} ok, {self.throttled} recuos)"
+                )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o header Retry-After (em segundos) para float"""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
@@ -0,0 +1,128 @@
+import heapq
+import itertools
+import os
+import random
+import time
+from typing import List, Optional
+
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "5"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "2"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "120"))
+
+
+class RetryItem:
+    def __init__(self, cpf: str):
+        self.cpf = cpf
+        self.attempts = 0
+        self.last_status: Optional[int] = None
+        self.last_error: Optional[str] = None
+        self.first_failed_at: Optional[float] = None
+
+    def __repr__(self):
+        return (
+            f"RetryItem({self.cpf}, tentativas={self.attempts}, "
+            f"status={self.last_status}, erro={self.last_error!r})"
+        )
+
+
+class RetryScheduler:
+    """Fila de espera dos CPFs que falharam, com backoff exponencial.
+
+    Um CPF que falha volta só depois de um atraso sorteado entre 0 e
+    `base_delay * 2 ** (tentativas - 1)` (limitado a `max_delay`, "full
+    jitter"), então falhas em massa não voltam todas no mesmo instante.
+    Enquanto isso os outros CPFs seguem. Depois de `max_attempts` falhas
+    o CPF sai da fila e `fail` devolve o item: é hora do dead-letter.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = RETRY_MAX_ATTEMPTS,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+        rng: random.Random = None,
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+        self.retried = 0
+        self.dead = 0
+        self._heap: List[tuple] = []
+        self._items = {}
+        self._seq = itertools.count()  # desempate estável no heap
+
+    def __len__(self):
+        return len(self._heap)
+
+    def backoff(self, attempts: int) -> float:
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return self.rng.uniform(0, ceiling)
+
+    def fail(
+        self, cpf: str, status: Optional[int] = None, error: str = None
+    ) -> Optional[RetryItem]:
+        """Registra uma falha e reagenda o CPF.
+
+        Devolve None se reagendou, ou o RetryItem quando as tentativas
+        acabaram.
+        """
+        item = self._items.get(cpf) or RetryItem(cpf)
+        item.attempts += 1
+        item.last_status = status
+        item.last_error = error
+        item.first_failed_at = item.first_failed_at or time.time()
+
+        if item.attempts >= self.max_attempts:
+            self._items.pop(cpf, None)
+            self.dead += 1
+            return item
+
+        delay = self.backoff(item.attempts)
+        self._items[cpf] = item
+        self.defer(cpf, delay)
+        self.retried += 1
+        logger.info(
+            f"CPF {cpf} reagendado em {delay:.1f}s "
+            f"(tentativa {item.attempts}/{self.max_attempts})"
+        )
+        return None
+
+    def defer(self, cpf: str, delay: float = 0.0):
+        """Reagenda sem contar tentativa (falha que não é do CPF)"""
+        heapq.heappush(
+            self._heap, (time.monotonic() + delay, next(self._seq), cpf)
+        )
+
+    def succeed(self, cpf: str):
+        self._items.pop(cpf, None)
+
+    def pop_due(self) -> Optional[str]:
+        """Próximo CPF cujo atraso já venceu, ou None"""
+        if self._heap and self._heap[0][0] <= time.monotonic():
+            return heapq.heappop(self._heap)[2]
+        return None
+
+    def next_due_in(self) -> float:
+        """Segundos até o próximo CPF vencer (0 se a fila está vazia)"""
+        if not self._heap:
+            return 0.0
+        return max(self._heap[0][0] - time.monotonic(), 0.0)
+
+    def waiting(self) -> List[str]:
+        """CPFs ainda na fila de espera"""
+        return [cpf for _, _, cpf in self._heap]
+
+    def item(self, cpf: str) -> Optional[RetryItem]:
+        return self._items.get(cpf)
+
+    def stats(self) -> dict:
+        return {
+            "waiting": len(self._heap),
+            "retried": self.retried,
+            "dead": self.dead,
+        }
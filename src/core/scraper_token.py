@@ -1,10 +1,16 @@
+import atexit
 import os
+import shutil
 import tempfile
+import threading
 import uuid
 import time
 import traceback
 import requests
 import json
+from contextlib import contextmanager
+from typing import Optional
+from urllib.parse import urlsplit
 
 from dotenv import load_dotenv
 
@@ -16,6 +22,8 @@ from selenium.webdriver import Chrome
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import TimeoutException
+from src.core.token_manager import write_token_file
 from src.log.logger import LoggerWebDriverManager, setup_logger
 from src.utils.helpers import WaitHelper
 
@@ -23,21 +31,36 @@ from src.utils.helpers import WaitHelper
 load_dotenv()
 
 URL_RO = os.getenv("URL_RO")
+# recicla o Chrome depois de N logins ou acima deste uso de memória
+DRIVER_MAX_USES = int(os.getenv("DRIVER_MAX_USES", "20"))
+DRIVER_MAX_RSS_MB = float(os.getenv("DRIVER_MAX_RSS_MB", "800"))
+TOKEN_CAPTURE_TIMEOUT = float(os.getenv("TOKEN_CAPTURE_TIMEOUT", "20"))
 
 
 logger = setup_logger()
 driver_logger = LoggerWebDriverManager(logger=logger)
 
 
+class TokenCaptureError(RuntimeError):
+    """O login no portal terminou sem um token utilizável"""
+
+
+class TokenCaptureTimeout(TokenCaptureError):
+    """O oauth/token não respondeu dentro de TOKEN_CAPTURE_TIMEOUT"""
+
+
 class WebDriverManager:
     def __init__(self):
-        user_data_dir = tempfile.mkdtemp(prefix=f"selenium_{uuid.uuid4()}_")
+        started = time.perf_counter()
+        self.user_data_dir = tempfile.mkdtemp(
+            prefix=f"selenium_{uuid.uuid4()}_"
+        )
         options = Options()
         options.add_argument("--start-maximized")
         options.add_argument("--disable-infobars")
         options.add_argument("--disable-extensions")
         options.add_argument("--disable-gpu")
-        options.add_argument(f"--user-data-dir={user_data_dir}")
+        options.add_argument(f"--user-data-dir={self.user_data_dir}")
         options.add_argument("--ignore-certificate-errors")
         options.add_argument("--disable-dev-shm-usage")
         options.add_argument("--no-sandbox")
@@ -45,102 +68,343 @@ class WebDriverManager:
         options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
         options.add_argument("--headless")  # Descomentar em produção
 
-        self.driver = Chrome(options=options)
+        try:
+            self.driver = Chrome(options=options)
+        except Exception:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            raise
         self.driver.set_page_load_timeout(10)
         self.driver.implicitly_wait(15)
         driver_logger.register_logger(driver=self.driver)
+        self.uses = 0
+        self.startup_seconds = time.perf_counter() - started
+
+    def rss_mb(self) -> float:
+        """Memória (RSS) do chromedriver e de todos os processos do Chrome"""
+        try:
+            root = self.driver.service.process.pid
+        except AttributeError:
+            return 0.0
+        total_kb, pending = 0, [root]
+        while pending:
+            pid = pending.pop()
+            try:
+                with open(f"/proc/{pid}/status") as f:
+                    for line in f:
+                        if line.startswith("VmRSS:"):
+                            total_kb += int(line.split()[1])
+                            break
+                for tid in os.listdir(f"/proc/{pid}/task"):
+                    with open(f"/proc/{pid}/task/{tid}/children") as f:
+                        pending.extend(int(c) for c in f.read().split())
+            except (FileNotFoundError, ProcessLookupError, ValueError):
+                continue
+        return total_kb / 1024
+
+    def reset(self):
+        """Limpa sessão do portal e log de rede para o próximo login"""
+        self.driver.get("about:blank")
+        self.driver.delete_all_cookies()
+        if URL_RO:
+            parts = urlsplit(URL_RO)
+            self.driver.execute_cdp_cmd(
+                "Storage.clearDataForOrigin",
+                {
+                    "origin": f"{parts.scheme}://{parts.netloc}",
+                    "storageTypes": "all",
+                },
+            )
+        self.driver.get_log("performance")  # descarta entradas antigas
+
+    def quit(self):
+        """Fecha o Chrome e apaga o diretório de perfil temporário"""
+        try:
+            self.driver.quit()
+        except Exception as e:
+            driver_logger.logger.warning(f"Erro ao fechar o Chrome: {e}")
+        finally:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+
+
+class DriverPool:
+    """Mantém um Chrome headless aquecido para as renovações de token.
+
+    Cada login pega a instância pronta em vez de subir um Chrome frio; ao
+    devolver, a sessão é limpa e, depois de `max_uses` logins ou acima de
+    `max_rss_mb` de memória, a instância é descartada (com o perfil) e a
+    próxima já começa a subir em segundo plano.
+    """
+
+    def __init__(
+        self,
+        max_uses: int = DRIVER_MAX_USES,
+        max_rss_mb: float = DRIVER_MAX_RSS_MB,
+    ):
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.starts = 0
+        self.startup_seconds = 0.0
+        self.renewals = 0
+        self.renewal_seconds = 0.0
+        self.recycled = 0
+        self._idle: Optional[WebDriverManager] = None
+        self._warming: Optional[threading.Thread] = None
+        self._lock = threading.Lock()  # um login por vez neste pool
+        self._closed = False
+
+    def _spawn(self) -> WebDriverManager:
+        manager = WebDriverManager()
+        self.starts += 1
+        self.startup_seconds += manager.startup_seconds
+        driver_logger.logger.info(
+            f"Chrome iniciado em {manager.startup_seconds:.1f}s"
+        )
+        return manager
+
+    def _warm(self):
+        try:
+            manager = self._spawn()
+        except Exception as e:
+            driver_logger.logger.error(f"Falha ao aquecer o Chrome: {e}")
+            return
+        if self._closed:
+            manager.quit()
+        else:
+            self._idle = manager
+
+    def warm_up(self):
+        """Sobe o próximo Chrome em segundo plano, se ainda não houver um"""
+        if self._closed or self._idle is not None:
+            return
+        if self._warming is not None and self._warming.is_alive():
+            return
+        self._warming = threading.Thread(
+            target=self._warm, name="chrome-warm-up", daemon=True
+        )
+        self._warming.start()
+
+    def _take(self) -> WebDriverManager:
+        if self._warming is not None:
+            self._warming.join()
+        manager, self._idle = self._idle, None
+        return manager or self._spawn()
+
+    def _release(self, manager: WebDriverManager, healthy: bool):
+        manager.uses += 1
+        rss = manager.rss_mb()
+        if healthy and manager.uses < self.max_uses and (
+            rss < self.max_rss_mb
+        ):
+            try:
+                manager.reset()
+                self._idle = manager
+                return
+            except Exception as e:
+                driver_logger.logger.warning(f"Falha ao limpar o Chrome: {e}")
 
+        driver_logger.logger.info(
+            f"Reciclando Chrome ({manager.uses} usos, {rss:.0f} MB)"
+        )
+        self.recycled += 1
+        manager.quit()
+        self.warm_up()
 
-class PageObject(WebDriverManager):
-    def __init__(self, username: str, password: str):
-        super().__init__()
+    @contextmanager
+    def driver(self):
+        """Empresta o Chrome aquecido durante um login"""
+        with self._lock:
+            started = time.perf_counter()
+            manager = self._take()
+            healthy = False
+            try:
+                yield manager.driver
+                healthy = True
+            finally:
+                self._release(manager, healthy)
+                self.renewals += 1
+                self.renewal_seconds += time.perf_counter() - started
+                driver_logger.logger.info(f"DriverPool: {self.stats()}")
+
+    def stats(self) -> dict:
+        return {
+            "starts": self.starts,
+            "avg_startup_s": round(
+                self.startup_seconds / max(self.starts, 1), 2
+            ),
+            "renewals": self.renewals,
+            "avg_renewal_s": round(
+                self.renewal_seconds / max(self.renewals, 1), 2
+            ),
+            "recycled": self.recycled,
+        }
+
+    def close(self):
+        self._closed = True
+        if self._warming is not None:
+            self._warming.join()
+        manager, self._idle = self._idle, None
+        if manager is not None:
+            manager.quit()
+
+
+# pool único do processo, criado na primeira chamada
+_default_pool: dict = {}
+_default_pool_lock = threading.Lock()
+
+
+def default_driver_pool() -> DriverPool:
+    with _default_pool_lock:
+        if "pool" not in _default_pool:
+            pool = _default_pool["pool"] = DriverPool()
+            atexit.register(pool.close)
+        return _default_pool["pool"]
+
+
+class OAuthResponseWatcher:
+    """Condição para o WaitHelper: a resposta do oauth/token terminou.
+
+    A cada chamada consome o que chegou no log de performance. Só as
+    entradas que contêm os textos procurados são decodificadas como JSON;
+    o resto é descartado com uma busca de substring.
+    """
+
+    def __init__(self, url_part: str = "oauth/token"):
+        self.url_part = url_part
+        self.request_id: Optional[str] = None
+        self.loaded = False
+        self.scanned = 0
+
+    def _match_response(self, raw: str):
+        if "Network.responseReceived" not in raw or self.url_part not in raw:
+            return
+        message = json.loads(raw)["message"]
+        if message.get("method") != "Network.responseReceived":
+            return
+        params = message.get("params", {})
+        if self.url_part in params.get("response", {}).get("url", ""):
+            self.request_id = params["requestId"]
+
+    def _match_finished(self, raw: str):
+        if "Network.loadingFinished" not in raw or self.request_id not in raw:
+            return
+        message = json.loads(raw)["message"]
+        if (
+            message.get("method") == "Network.loadingFinished"
+            and message.get("params", {}).get("requestId") == self.request_id
+        ):
+            self.loaded = True
+
+    def __call__(self, driver) -> bool:
+        for entry in driver.get_log("performance"):
+            self.scanned += 1
+            raw = entry["message"]
+            if self.request_id is None:
+                self._match_response(raw)
+            elif not self.loaded:
+                self._match_finished(raw)
+        return self.loaded
+
+
+class PageObject:
+    def __init__(
+        self, username: str, password: str, pool: DriverPool = None
+    ):
         self.username = username
         self.password = password
-
-    def _slow_time(self, seconds: int):
-        time.sleep(seconds)
+        self.pool = pool or default_driver_pool()
 
     def login_gov(self):
+        """Login no portal com o Chrome do pool (devolvido no final)"""
+        with self.pool.driver() as driver:
+            self.driver = driver
+            return self._capture_token()
+
+    def _capture_token(self):
+        timings = {}
+        phase_started = time.perf_counter()
+
+        def _phase(name: str):
+            nonlocal phase_started
+            now = time.perf_counter()
+            timings[name] = round(now - phase_started, 2)
+            phase_started = now
+
         try:
             driver_logger.logger.info("Login started")
             self.driver.get(URL_RO)
+            _phase("page_load")
 
             # Preenche usuário e senha
             user = WaitHelper.wait_for_element(
                 self.driver, By.NAME, "usuario", timeout=6, visible=True
             )
             user.send_keys(self.username)
-            self._slow_time(3)
 
             password = WaitHelper.wait_for_element(
-                self.driver, By.NAME, "senha", timeout=6, visible=True
+                self.driver, By.NAME, "senha", timeout=6, clickable=True
             )
             password.send_keys(self.password)
             password.send_keys(Keys.ENTER)
+            _phase("submit")
             driver_logger.logger.info("Login successful")
-            self._slow_time(
-                5
-            )  # Aumentei o tempo para garantir que a requisição do token seja feita
-
-            # Capturar logs de rede (Network)
-            logs = self.driver.get_log("performance")
-
-            token_data = None
-            for log in logs:
-                try:
-                    message = json.loads(log["message"])["message"]
-                    if message.get("method") == "Network.responseReceived":
-                        url = (
-                            message.get("params", {})
-                            .get("response", {})
-                            .get("url", "")
-                        )
-                        if "oauth/token" in url:
-                            request_id = message["params"]["requestId"]
-                            # Pegar o corpo da resposta
-                            response_body = self.driver.execute_cdp_cmd(
-                                "Network.getResponseBody",
-                                {"requestId": request_id},
-                            )
-                            token_data = json.loads(response_body["body"])
-                            break
-                except:
-                    continue
 
-            if token_data:
-                print("\n✅ Token capturado com sucesso:")
-                print(json.dumps(token_data, indent=4, ensure_ascii=False))
+            # Espera a própria resposta do oauth/token no log de rede
+            watcher = OAuthResponseWatcher()
+            try:
+                WaitHelper.wait_for(
+                    self.driver,
+                    watcher,
+                    timeout=TOKEN_CAPTURE_TIMEOUT,
+                    poll_frequency=0.1,
+                    message="Timeout esperando a resposta do oauth/token",
+                )
+            except TimeoutException:
+                _phase("wait_token")
+                raise TokenCaptureTimeout(
+                    f"oauth/token não respondeu em "
+                    f"{TOKEN_CAPTURE_TIMEOUT:.0f}s ({watcher.scanned} "
+                    f"eventos lidos, fases: {timings})"
+                ) from None
+            _phase("wait_token")
 
-                with open("token_response.json", "w", encoding="utf-8") as f:
-                    json.dump(token_data, f, indent=4, ensure_ascii=False)
+            response_body = self.driver.execute_cdp_cmd(
+                "Network.getResponseBody", {"requestId": watcher.request_id}
+            )
+            token_data = json.loads(response_body["body"])
+            _phase("read_body")
 
-                return token_data
-            else:
-                print(
-                    "\n❌ Não foi possível capturar o token. Verifique se a requisição foi feita."
+            if "access_token" not in token_data:
+                raise TokenCaptureError(
+                    "Resposta do oauth/token sem 'access_token'"
                 )
-                return None
 
+            # base para calcular o vencimento a partir de expires_in
+            token_data["obtained_at"] = time.time()
+            write_token_file(token_data)
+            driver_logger.logger.info(
+                f"✅ Token capturado em {sum(timings.values()):.2f}s "
+                f"({watcher.scanned} eventos lidos, fases: {timings})"
+            )
+            return token_data
+
+        except TokenCaptureError as e:
+            driver_logger.logger.error(f"❌ {e}")
+            raise
         except Exception as e:
             driver_logger.logger.error(
                 f"Erro no login: {e.__class__.__name__}: {str(e)}"
             )
             driver_logger.logger.debug(traceback.format_exc())
             raise
-        finally:
-            if hasattr(self, "driver"):
-                self.driver.quit()
-                print("Navegador fechado.")
 
 
 class ScrapePoolExecute:
     def __init__(self, username: str, password: str, *args, **kwargs):
         self.page_objects = PageObject(username=username, password=password)
-        driver_logger.register_logger(driver=self.page_objects.driver)
 
     def run(self):
         try:
-            self.page_objects.login_gov()
+            return self.page_objects.login_gov()
         except Exception as e:
             driver_logger.logger.error(
                 f"Error running scraping pool: {str(e)}"
@@ -0,0 +1,102 @@
+import os
+import time
+from http import HTTPStatus
+from typing import Optional
+
+import requests
+from dotenv import load_dotenv
+
+from src.core.http_client import USER_AGENT
+from src.log.logger import setup_logger
+
+load_dotenv()
+
+logger = setup_logger()
+
+OAUTH_TOKEN_URL = os.getenv("OAUTH_TOKEN_URL")
+OAUTH_CLIENT_ID = os.getenv("OAUTH_CLIENT_ID")
+OAUTH_CLIENT_SECRET = os.getenv("OAUTH_CLIENT_SECRET", "")
+OAUTH_SCOPE = os.getenv("OAUTH_SCOPE")
+OAUTH_GRANT_TYPE = os.getenv("OAUTH_GRANT_TYPE", "password")
+
+
+class OAuthTokenError(Exception):
+    """O oauth/token respondeu, mas não devolveu um token utilizável"""
+
+
+class OAuthTokenClient:
+    """Faz direto a mesma troca usuário/senha -> token do login no portal.
+
+    É o POST em `oauth/token` que o Selenium capturava no log de rede,
+    sem abrir o Chrome: uma requisição em vez de 10+ segundos de browser.
+    `client` é o par (client_id, client_secret) do Basic auth, se houver.
+    """
+
+    grant_type = OAUTH_GRANT_TYPE
+    timeout = 10
+
+    def __init__(
+        self,
+        token_url: str,
+        username: str,
+        password: str,
+        client: tuple = None,
+        scope: str = None,
+    ):
+        self.token_url = token_url
+        self.username = username
+        self.password = password
+        self.client = client
+        self.scope = scope
+
+    @classmethod
+    def from_env(cls) -> Optional["OAuthTokenClient"]:
+        """Cliente configurado pelo .env, ou None sem OAUTH_TOKEN_URL"""
+        if not OAUTH_TOKEN_URL:
+            return None
+        return cls(
+            OAUTH_TOKEN_URL,
+            os.getenv("USERNAME_RO"),
+            os.getenv("PASSWORD_RO"),
+            client=(
+                (OAUTH_CLIENT_ID, OAUTH_CLIENT_SECRET)
+                if OAUTH_CLIENT_ID
+                else None
+            ),
+            scope=OAUTH_SCOPE,
+        )
+
+    def fetch(self) -> dict:
+        """Retorna a resposta do oauth/token com `obtained_at` preenchido"""
+        form = {
+            "grant_type": self.grant_type,
+            "username": self.username,
+            "password": self.password,
+        }
+        if self.scope:
+            form["scope"] = self.scope
+        started = time.perf_counter()
+        response = requests.post(
+            self.token_url,
+            data=form,
+            auth=self.client,
+            headers={"User-Agent": USER_AGENT, "Accept": "application/json"},
+            timeout=self.timeout,
+        )
+        if response.status_code != HTTPStatus.OK:
+            raise OAuthTokenError(
+                f"oauth/token respondeu {response.status_code}: "
+                f"{response.text[:200]}"
+            )
+        try:
+            token_data = response.json()
+        except ValueError as e:
+            raise OAuthTokenError("oauth/token não devolveu JSON") from e
+        if "access_token" not in token_data:
+            raise OAuthTokenError("Resposta sem 'access_token'")
+
+        token_data["obtained_at"] = time.time()
+        logger.info(
+            f"Token obtido via HTTP em {time.perf_counter() - started:.2f}s"
+        )
+        return token_data
@@ -0,0 +1,415 @@
+import base64
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+TOKEN_PATH = os.getenv("TOKEN_PATH", "token_response.json")
+# renova este tanto de segundos antes do vencimento
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", "120"))
+# validade assumida quando a resposta não traz expires_in nem exp
+TOKEN_DEFAULT_TTL = float(os.getenv("TOKEN_DEFAULT_TTL", "1800"))
+TOKEN_RETRY_INTERVAL = float(os.getenv("TOKEN_RETRY_INTERVAL", "15"))
+# "postgres" compartilha o token entre máquinas via spreed.token_lease
+TOKEN_STORE = os.getenv("TOKEN_STORE", "file")
+TOKEN_STORE_POLL = float(os.getenv("TOKEN_STORE_POLL", "5"))
+
+
+def _jwt_exp(access_token: str) -> Optional[float]:
+    """Campo `exp` do payload, se o access_token for um JWT"""
+    try:
+        payload = access_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return None
+
+
+class TokenInfo:
+    def __init__(self, access_token: str, expires_at: float):
+        self.access_token = access_token
+        self.expires_at = expires_at
+
+    @classmethod
+    def from_response(cls, data: dict, obtained_at: float) -> "TokenInfo":
+        """Monta o token a partir da resposta do oauth/token.
+
+        A validade vem de `expires_in` (relativo a `obtained_at`); sem ele,
+        usa o `exp` do JWT e, em último caso, TOKEN_DEFAULT_TTL.
+        """
+        if "access_token" not in data:
+            raise KeyError("Token file does not contain 'access_token'")
+
+        access_token = data["access_token"]
+        if data.get("expires_in") is not None:
+            expires_at = obtained_at + float(data["expires_in"])
+        else:
+            expires_at = _jwt_exp(access_token) or (
+                obtained_at + TOKEN_DEFAULT_TTL
+            )
+        return cls(access_token, expires_at)
+
+    def ttl(self) -> float:
+        return self.expires_at - time.time()
+
+    def __repr__(self):
+        return f"TokenInfo(expires_in={self.ttl():.0f}s)"
+
+
+_file_cache: Dict[str, Tuple[tuple, TokenInfo]] = {}
+_file_cache_lock = threading.Lock()
+
+
+def read_token_file(path: str = TOKEN_PATH) -> TokenInfo:
+    """Lê o token_response.json gravado pelo login.
+
+    `obtained_at` é gravado junto com a resposta; arquivos antigos, sem o
+    campo, usam a data de modificação do arquivo. O resultado fica em
+    cache até o arquivo mudar (mtime/tamanho), então reler é só um stat.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Token file not found: {path}") from None
+
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _file_cache_lock:
+        cached = _file_cache.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    obtained_at = data.get("obtained_at") or stat.st_mtime
+    info = TokenInfo.from_response(data, float(obtained_at))
+    with _file_cache_lock:
+        _file_cache[path] = (key, info)
+    return info
+
+
+def write_token_file(token_data: dict, path: str = TOKEN_PATH):
+    """Grava em um temporário e troca com os.replace.
+
+    Leitores (outras threads ou processos) veem o arquivo antigo ou o novo
+    inteiro, nunca um JSON pela metade.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=".token_", suffix=".json", dir=directory
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(token_data, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def token_file_lock(path: str = TOKEN_PATH):
+    """Lock exclusivo (flock) em `path`.lock, entre processos da máquina.
+
+    Os shards do ShardedRunner dividem o mesmo token_response.json; só
+    quem tem o lock faz login, os outros esperam e relêem o arquivo.
+    """
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def selenium_login():
+    """Login no portal via Selenium (captura o oauth/token do log de rede)"""
+    from src.core.scraper_token import ScrapePoolExecute
+
+    logger.warning("⚠️ Renovando token com Selenium...")
+    token_data = ScrapePoolExecute(
+        username=os.getenv("USERNAME_RO"), password=os.getenv("PASSWORD_RO")
+    ).run()
+    if token_data is None:
+        raise RuntimeError("Selenium não capturou o token")
+
+
+def selenium_is_active(login: Callable[[], None]) -> bool:
+    """True se os logins de `login` vão passar pelo Chrome"""
+    if login is selenium_login:
+        return True
+    if login is not default_login:
+        return False
+    from src.core.token_client import OAuthTokenClient
+
+    return OAuthTokenClient.from_env() is None
+
+
+def default_login():
+    """Renovação padrão: POST direto no oauth/token; Selenium se falhar"""
+    import requests
+
+    from src.core.token_client import OAuthTokenClient, OAuthTokenError
+
+    client = OAuthTokenClient.from_env()
+    if client is not None:
+        try:
+            write_token_file(client.fetch())
+            return
+        except (OAuthTokenError, requests.RequestException) as e:
+            logger.warning(f"Token via HTTP falhou, usando Selenium: {e}")
+    selenium_login()
+
+
+def default_store():
+    if TOKEN_STORE != "postgres":
+        return None
+    from src.database.token_store import PostgresTokenStore
+
+    return PostgresTokenStore()
+
+
+class TokenManager:
+    """Mantém o token válido, renovando em segundo plano antes de vencer.
+
+    A thread de refresh acorda `refresh_margin` segundos antes do
+    vencimento, chama `login` (que grava um novo token_response.json) e
+    avisa os inscritos (`subscribe`) com o novo access_token. As
+    requisições só leem `token`; nunca esperam pela renovação.
+
+    `refresh` é single-flight: chamadas simultâneas (vários 401 ao mesmo
+    tempo) viram um único login, e as demais esperam o resultado dele.
+    Entre processos da mesma máquina o login passa por `token_file_lock`.
+    Com um `store` (ex.: PostgresTokenStore) isso vale entre máquinas, e
+    a thread de refresh também busca o token renovado por outro nó, a
+    cada `store_poll` segundos.
+    """
+
+    store_poll = TOKEN_STORE_POLL
+
+    def __init__(
+        self,
+        path: str = TOKEN_PATH,
+        login: Callable[[], None] = default_login,
+        refresh_margin: float = TOKEN_REFRESH_MARGIN,
+        retry_interval: float = TOKEN_RETRY_INTERVAL,
+        store=None,
+    ):
+        self.path = path
+        self.store = store if store is not None else default_store()
+        self.login = login
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.info: Optional[TokenInfo] = None
+        self.refreshes = 0
+        self.waiters = 0
+        self._subscribers: List[Callable[[str], None]] = []
+        self._cond = threading.Condition()
+        self._renewing = False
+        self._generation = 0
+        self._error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def token(self) -> Optional[str]:
+        return self.info.access_token if self.info else None
+
+    def subscribe(self, callback: Callable[[str], None]):
+        self._subscribers.append(callback)
+        if self.info:
+            callback(self.info.access_token)
+
+    def _publish(self, info: TokenInfo):
+        if self.info is not None and self.info.access_token == (
+            info.access_token
+        ):
+            self.info = info
+            return
+        self.info = info
+        for callback in self._subscribers:
+            callback(info.access_token)
+
+    def needs_refresh(self) -> bool:
+        return self.info is None or self.info.ttl() <= self.refresh_margin
+
+    def _stored(self) -> Optional[TokenInfo]:
+        """Token mais novo entre o arquivo local e o store"""
+        found = []
+        try:
+            found.append(read_token_file(self.path))
+        except FileNotFoundError:
+            if self.store is None:
+                raise
+        if self.store is not None:
+            stored = self.store.read()
+            if stored is not None:
+                found.append(stored)
+        return max(found, key=lambda info: info.expires_at, default=None)
+
+    def load(self) -> TokenInfo:
+        """Lê o token salvo; renova na hora se já estiver vencendo"""
+        with self._cond:
+            info = self._stored()
+            if info is not None:
+                self._publish(info)
+        if self.needs_refresh():
+            self.refresh(stale_token=self.token)
+        return self.info
+
+    def _sync_from_store(self):
+        stored = self.store.read()
+        with self._cond:
+            if stored is not None and (
+                self.info is None or stored.expires_at > self.info.expires_at
+            ):
+                self._publish(stored)
+
+    def refresh(self, stale_token: str = None) -> TokenInfo:
+        """Renova o token, a menos que `stale_token` já tenha sido trocado.
+
+        Quem chega com uma renovação em andamento não faz outro login:
+        espera a que está em voo terminar e recebe o mesmo token (ou o
+        mesmo erro).
+        """
+        with self._cond:
+            if stale_token is not None and self.token != stale_token:
+                return self.info
+            if self._renewing:
+                generation = self._generation
+                self.waiters += 1
+                try:
+                    self._cond.wait_for(
+                        lambda: self._generation != generation
+                    )
+                finally:
+                    self.waiters -= 1
+                if self._error is not None:
+                    raise RuntimeError("Falha ao renovar token.") from (
+                        self._error
+                    )
+                return self.info
+            self._renewing = True
+
+        info, error = None, None
+        try:
+            info = self._renew()
+            return info
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            with self._cond:
+                if info is not None:
+                    self._publish(info)
+                self._error = error
+                self._renewing = False
+                self._generation += 1
+                self._cond.notify_all()
+
+    def _renew(self) -> TokenInfo:
+        with token_file_lock(self.path):
+            # outro processo pode ter renovado o arquivo enquanto
+            # esperávamos o lock
+            try:
+                latest = read_token_file(self.path)
+                if (
+                    latest.ttl() > self.refresh_margin
+                    and latest.access_token != self.token
+                ):
+                    return latest
+            except (FileNotFoundError, KeyError, ValueError):
+                pass
+
+            self._warm_login_driver()
+            if self.store is not None:
+                return self.store.renew(
+                    self._login, self.token, self.refresh_margin
+                )
+            return self._login()
+
+    def _warm_login_driver(self):
+        """Sobe o Chrome do pool quando o login vai passar pelo Selenium.
+
+        Só o processo que tem o lock e vai de fato logar chega aqui: os
+        shards do --mode process que só releem o token renovado não mantêm
+        um Chrome ocioso cada um. Depois do login o Chrome fica no pool
+        para a próxima renovação.
+        """
+        if not selenium_is_active(self.login):
+            return
+        from src.core.scraper_token import default_driver_pool
+
+        default_driver_pool().warm_up()
+
+    def _login(self) -> TokenInfo:
+        stale_token = self.token
+        started = time.perf_counter()
+        self.login()
+        try:
+            info = read_token_file(self.path)
+        except (FileNotFoundError, KeyError) as e:
+            raise RuntimeError("Falha ao renovar token.") from e
+
+        # login que não gravou nada relê o token antigo: isso é falha, senão
+        # _next_wait() devolve 0 e o _run repete o login sem parar
+        if info.access_token == stale_token or (
+            info.ttl() <= self.refresh_margin
+        ):
+            raise RuntimeError(
+                f"Login não produziu um token novo ({info!r})"
+            )
+
+        self.refreshes += 1
+        logger.info(
+            f"🔄 Token renovado em {time.perf_counter() - started:.1f}s "
+            f"(vence em {info.ttl():.0f}s)"
+        )
+        return info
+
+    def _next_wait(self) -> float:
+        if self.info is None:
+            return 0
+        wait = max(self.info.ttl() - self.refresh_margin, 0)
+        if self.store is not None:
+            wait = min(wait, self.store_poll)
+        return wait
+
+    def _run(self):
+        while not self._stop.wait(self._next_wait()):
+            try:
+                if self.needs_refresh():
+                    self.refresh(stale_token=self.token)
+                elif self.store is not None:
+                    self._sync_from_store()
+            except Exception as e:
+                logger.error(f"Erro ao renovar token em segundo plano: {e}")
+                # tenta de novo sem travar o loop com o token vencendo
+                if self._stop.wait(self.retry_interval):
+                    return
+
+    def start(self):
+        """Inicia a renovação em segundo plano (idempotente)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="token-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
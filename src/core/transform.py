@@ -0,0 +1,159 @@
+import hashlib
+from decimal import Decimal
+from typing import Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+# campos que entram no hash de conteúdo (tudo menos a chave e o próprio hash)
+HASHED_FIELDS = (
+    "nome",
+    "cargo",
+    "lotacao",
+    "classificacao",
+    "margem_disponivel",
+    "margem_cartao",
+    "margem_cartao_beneficio",
+    "nome_cargo",
+    "situacao",
+    "is_pensionista",
+    "list_status",
+)
+
+
+def row_hash(row: dict) -> str:
+    """SHA-1 do conteúdo da linha; igual -> o upsert não reescreve"""
+    raw = "\x1f".join(str(row.get(field, "")) for field in HASHED_FIELDS)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def build_result_rows(data: list, cpf: str) -> list:
+    """Converte o retorno da API em linhas de spreed.result_search_ro"""
+    rows = []
+    for item in data:
+        # Decimal(str(...)) mantém o texto original da API, então o
+        # content_hash não muda com a troca das colunas para NUMERIC
+        margem_disponivel = Decimal(str(item.get("margemDisponivel", 0.0)))
+        margem_cartao = Decimal(str(item.get("margemCartaoDisponivel", 0.0)))
+        margem_cartao_beneficio = Decimal(
+            str(item.get("margemCartaoBeneficio", 0.0))
+        )
+
+        rows.append(
+            {
+                "nome": item.get("nomFuncionario", "").strip(),
+                "matricula": str(item.get("numMatricula", "")),
+                "cpf": cpf,
+                "cargo": item.get("nomCargo", "").strip(),
+                "lotacao": item.get("nomLotacao", "").strip(),
+                "classificacao": item.get("nomClassificacao", "").strip(),
+                "margem_disponivel": margem_disponivel,
+                "margem_cartao": margem_cartao,
+                "margem_cartao_beneficio": margem_cartao_beneficio,
+                "nome_cargo": item.get("nomCargo", "").strip(),
+                "situacao": item.get("situacao", "").strip(),
+                "is_pensionista": item.get("isPensionista", ""),
+                "list_status": any(
+                    [
+                        margem_disponivel > 0,
+                        margem_cartao > 0,
+                        margem_cartao_beneficio > 0,
+                    ]
+                ),
+            }
+        )
+        rows[-1]["content_hash"] = row_hash(rows[-1])
+    return rows
+
+
+# campo da API -> coluna, para os textos que passam por strip()
+TEXT_FIELDS = {
+    "nome": "nomFuncionario",
+    "cargo": "nomCargo",
+    "lotacao": "nomLotacao",
+    "classificacao": "nomClassificacao",
+    "nome_cargo": "nomCargo",
+    "situacao": "situacao",
+}
+MARGIN_FIELDS = {
+    "margem_disponivel": "margemDisponivel",
+    "margem_cartao": "margemCartaoDisponivel",
+    "margem_cartao_beneficio": "margemCartaoBeneficio",
+}
+RESULT_COLUMNS = [
+    "nome",
+    "matricula",
+    "cpf",
+    "cargo",
+    "lotacao",
+    "classificacao",
+    "margem_disponivel",
+    "margem_cartao",
+    "margem_cartao_beneficio",
+    "nome_cargo",
+    "situacao",
+    "is_pensionista",
+    "list_status",
+]
+
+
+def build_result_frame(payloads: Iterable[Tuple[str, list]]) -> pd.DataFrame:
+    """Versão em lote de `build_result_rows` para as respostas de vários CPFs.
+
+    Gera as mesmas linhas (inclusive o `content_hash`), com strip e
+    `list_status` feitos por coluna: `list_status` sai de
+    `pd.to_numeric(...).gt(0)` e o Decimal só é montado para as margens
+    gravadas, uma vez por valor distinto. O hash usa o texto da API, que é
+    o mesmo de `str(Decimal(str(valor)))`.
+    """
+    cpfs, items = [], []
+    for cpf, data in payloads:
+        for item in data or ():
+            cpfs.append(cpf)
+            items.append(item)
+    if not items:
+        return pd.DataFrame(columns=RESULT_COLUMNS + ["content_hash"])
+
+    # object preserva o texto original (0 continua "0", não "0.0")
+    raw = pd.DataFrame(items, dtype=object)
+
+    def _text(field: str, default, func=str) -> np.ndarray:
+        # cargo, lotação, situação e margens se repetem muito: `func` roda
+        # uma vez por valor distinto e o resultado é espalhado pelos códigos
+        if field not in raw:
+            return np.full(len(raw), func(str(default)), dtype=object)
+        # fatoriza o texto: em object 1, 1.0 e True têm o mesmo hash e
+        # viravam um só valor ("1" no lugar de "1.0")
+        text = raw[field].map(str, na_action="ignore")
+        codes, uniques = pd.factorize(text, use_na_sentinel=False)
+        mapped = [
+            func(str(default) if pd.isna(value) else value)
+            for value in uniques
+        ]
+        return np.array(mapped, dtype=object)[codes]
+
+    frame = pd.DataFrame({"cpf": cpfs}, index=raw.index)
+    for column, field in TEXT_FIELDS.items():
+        frame[column] = _text(field, "", str.strip)
+    frame["matricula"] = _text("numMatricula", "")
+    frame["is_pensionista"] = _text("isPensionista", "")
+
+    margins = {}
+    positive = pd.Series(False, index=raw.index)
+    for column, field in MARGIN_FIELDS.items():
+        values = raw[field] if field in raw else pd.Series(0.0, raw.index)
+        positive |= pd.to_numeric(values, errors="coerce").gt(0)
+        margins[column] = pd.Series(_text(field, 0.0), index=raw.index)
+        frame[column] = _text(field, 0.0, Decimal)
+    frame["list_status"] = positive
+
+    frame = frame[RESULT_COLUMNS]
+    hashed = {field: frame[field] for field in HASHED_FIELDS}
+    hashed.update(margins)
+    hashed["list_status"] = positive.map({True: "True", False: "False"})
+    frame["content_hash"] = [
+        hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+        for values in zip(*(column.tolist() for column in hashed.values()))
+    ]
+    return frame
+
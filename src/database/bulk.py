@@ -0,0 +1,167 @@
+import io
+from typing import Sequence
+
+import pandas as pd
+from sqlalchemy.dialects.postgresql import insert
+
+from src.core.transform import TEXT_FIELDS
+from src.database.schemas import ResultSearchRo
+
+RESULT_KEY = ("cpf", "matricula")
+RESULT_TABLE = (
+    f"{ResultSearchRo.__table__.schema}.{ResultSearchRo.__tablename__}"
+)
+
+
+def _quoted(columns) -> str:
+    return ", ".join(f'"{c}"' for c in columns)
+
+
+def copy_frame(
+    dbapi_conn, table: str, df: pd.DataFrame, not_null: Sequence[str] = ()
+) -> int:
+    """Envia um DataFrame para `table` via COPY ... FROM STDIN (CSV).
+
+    Valores nulos viram campos vazios sem aspas, que o COPY em CSV lê como
+    NULL; nas colunas `not_null` o campo vazio continua string vazia.
+    Funciona com psycopg2 (`copy_expert`) e psycopg 3 (`copy`).
+    """
+    if df.empty:
+        return 0
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    options = "FORMAT csv"
+    if not_null:
+        options += f", FORCE_NOT_NULL ({_quoted(not_null)})"
+    sql = f"COPY {table} ({_quoted(df.columns)}) FROM STDIN WITH ({options})"
+
+    cursor = dbapi_conn.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(sql, buffer)
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+    return len(df)
+
+
+def _staging_table(cursor, staging: str, table: str, columns: str):
+    """Tabela temporária vazia com `columns` de `table`, que some no commit.
+
+    Só os tipos: sem default, índice nem NOT NULL. Com os defaults (LIKE
+    ... INCLUDING DEFAULTS) cada linha do COPY chamaria nextval no id e
+    queimaria a sequence da tabela real.
+    """
+    cursor.execute(
+        f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DROP AS "
+        f"SELECT {columns} FROM {table} WITH NO DATA"
+    )
+    cursor.execute(f"TRUNCATE {staging}")
+
+
+def copy_insert_new(
+    dbapi_conn,
+    table: str,
+    df: pd.DataFrame,
+    key: str,
+    staging: str = "ingest_staging",
+) -> int:
+    """COPY para uma tabela temporária e INSERT ... ON CONFLICT DO NOTHING.
+
+    O COPY não sabe ignorar conflitos; passando pela tabela de staging,
+    linhas cuja `key` já existe em `table` (de cargas anteriores ou de
+    chunks anteriores da mesma transação) são descartadas. As linhas
+    entram em ordem de `key`, então cargas paralelas travam as chaves do
+    índice único na mesma ordem. Retorna quantas linhas entraram de fato.
+    """
+    if df.empty:
+        return 0
+
+    columns = _quoted(df.columns)
+    cursor = dbapi_conn.cursor()
+    try:
+        _staging_table(cursor, staging, table, columns)
+        copy_frame(dbapi_conn, staging, df)
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) "
+            f'SELECT {columns} FROM {staging} ORDER BY "{key}" '
+            f'ON CONFLICT ("{key}") DO NOTHING'
+        )
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def dedupe_rows(rows: list, key=RESULT_KEY) -> list:
+    """Última linha de cada chave; o ON CONFLICT não aceita a mesma chave
+    duas vezes no mesmo comando"""
+    latest = {}
+    for row in rows:
+        latest[tuple(row[k] for k in key)] = row
+    return list(latest.values())
+
+
+def upsert_results(conn, rows: list) -> int:
+    """Grava linhas de result_search_ro por (cpf, matricula).
+
+    Linhas novas são inseridas; existentes só são reescritas quando o
+    `content_hash` mudou. Retorna quantas linhas foram de fato gravadas.
+    """
+    rows = dedupe_rows(rows)
+    if not rows:
+        return 0
+
+    stmt = insert(ResultSearchRo)
+    updatable = {
+        column.name: stmt.excluded[column.name]
+        for column in ResultSearchRo.__table__.columns
+        if column.name not in ("id", *RESULT_KEY)
+    }
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(RESULT_KEY),
+        set_=updatable,
+        where=ResultSearchRo.content_hash.is_distinct_from(
+            stmt.excluded.content_hash
+        ),
+    ).returning(ResultSearchRo.id)
+    return len(conn.execute(stmt, rows).all())
+
+
+def copy_upsert_results(
+    dbapi_conn, df: pd.DataFrame, staging: str = "result_staging"
+) -> int:
+    """`upsert_results` para um DataFrame de `build_result_frame`.
+
+    O frame vai por COPY para uma tabela temporária e de lá para
+    result_search_ro em um INSERT ... ON CONFLICT, sem virar dicts nem
+    parâmetros. Mesma regra: só reescreve quando o `content_hash` mudou.
+    Retorna quantas linhas foram de fato gravadas.
+    """
+    df = df.drop_duplicates(subset=list(RESULT_KEY), keep="last")
+    if df.empty:
+        return 0
+
+    columns = _quoted(df.columns)
+    key = _quoted(RESULT_KEY)
+    updates = ", ".join(
+        f'"{c}" = EXCLUDED."{c}"' for c in df.columns if c not in RESULT_KEY
+    )
+    cursor = dbapi_conn.cursor()
+    try:
+        _staging_table(cursor, staging, RESULT_TABLE, columns)
+        text_columns = [*TEXT_FIELDS, "matricula", "is_pensionista"]
+        copy_frame(dbapi_conn, staging, df, not_null=text_columns)
+        cursor.execute(
+            f"INSERT INTO {RESULT_TABLE} AS r ({columns}) "
+            f"SELECT {columns} FROM {staging} ORDER BY {key} "
+            f"ON CONFLICT ({key}) DO UPDATE SET {updates} "
+            f"WHERE r.content_hash IS DISTINCT FROM EXCLUDED.content_hash"
+        )
+        return cursor.rowcount
+    finally:
+        cursor.close()
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert
+
+from src.core.retry import RetryItem
+from src.database.schemas import RoDeadLetter, SearchRo, engine
+from src.database.work_queue import dead_values, finished_by
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+
+def move_to_dead_letter(item: RetryItem, bind=engine, owner: str = None):
+    """Registra o CPF em spreed.ro_dead_letter e o tira da fila.
+
+    As duas escritas vão na mesma transação; repetir o CPF (uma nova
+    carga que o reabriu, por exemplo) só atualiza a linha existente. Com
+    `owner` (WorkQueue), um CPF que já não está reservado por ele fica
+    com quem o pegou e não vai para o dead-letter.
+    """
+    first_failed_at = (
+        datetime.fromtimestamp(item.first_failed_at, timezone.utc)
+        if item.first_failed_at
+        else None
+    )
+    values = {
+        "attempts": item.attempts,
+        "last_status": item.last_status,
+        "last_error": item.last_error,
+        "first_failed_at": first_failed_at,
+        "dead_at": datetime.now(timezone.utc),
+    }
+    with bind.begin() as conn:
+        result = conn.execute(
+            update(SearchRo)
+            .where(finished_by([item.cpf], owner))
+            .values(**dead_values())
+        )
+        if owner is not None and result.rowcount == 0:
+            logger.warning(
+                f"CPF {item.cpf} já não está reservado por {owner}; "
+                f"dead-letter ignorado"
+            )
+            return
+        conn.execute(
+            insert(RoDeadLetter)
+            .values(cpf=item.cpf, **values)
+            .on_conflict_do_update(index_elements=["cpf"], set_=values)
+        )
+    logger.error(f"☠️ CPF {item.cpf} movido para o dead-letter: {item!r}")
@@ -1,88 +1,439 @@
+import argparse
+import glob
+import hashlib
+import multiprocessing as mp
 import os
+import random
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import pandas as pd
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, insert
+from sqlalchemy import create_engine, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker
 
-from src.database.schemas import SearchRo
+from src.database.bulk import copy_insert_new
+from src.database.schemas import IngestManifest, SearchRo
+from src.database.work_queue import STATUS_INVALID, STATUS_PENDING
+from src.log.logger import setup_logger
+from src.utils.cpf import CPF_LENGTH, normalize_cpf_series, valid_cpf_mask
 
 load_dotenv()
 
+logger = setup_logger()
+
 DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URI")
 engine = create_engine(
     DATABASE_URL, connect_args={"options": "-csearch_path=spreed"}
 )
 Session = sessionmaker(bind=engine)
 
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "50000"))
+INGEST_PROCESSES = int(
+    os.getenv("INGEST_PROCESSES", str(min(os.cpu_count() or 1, 4)))
+)
+INGEST_PATTERN = os.getenv("INGEST_PATTERN", "*.csv")
+# tentativas de um chunk que caiu em deadlock com outra carga paralela
+INGEST_DEADLOCK_RETRIES = int(os.getenv("INGEST_DEADLOCK_RETRIES", "3"))
+
+DEADLOCK_SQLSTATE = "40P01"
+
+MANIFEST_LOADING = "loading"
+MANIFEST_DONE = "done"
+
+RENAME_MAP = {
+    "CPF": "cpf",
+    "NOME": "nome",
+    "SEXO": "sexo",
+    "ENDERECO": "endereco",
+    "NUMERO": "numero",
+    "COMPLEMENTO": "complemento",
+    "BAIRRO": "bairro",
+    "CIDADE": "cidade",
+    "UF": "uf",
+    "CEP": "cep",
+    "CELULAR1": "celular1",
+    "WHATSAPP1": "whatsapp1",
+    "CELULAR2": "celular2",
+    "WHATSAPP2": "whatsapp2",
+    "CELULAR3": "celular3",
+    "WHATSAPP3": "whatsapp3",
+    "FIXO1": "fixo1",
+    "FIXO2": "fixo2",
+    "FIXO3": "fixo3",
+    "DATA_NASCIMENTO": "data_nascimento",
+    "IDADE": "idade",
+    "EMAIL1": "email1",
+    "EMAIL2": "email2",
+    "EMAIL3": "email3",
+    "RENDA": "renda",
+    "NOME_MAE": "nome_mae",
+    "NOMENCLATURA_ESCOLARIDADE": "nomenclatura_escolaridade",
+}
+
+VALID_COLUMNS = [c.name for c in SearchRo.__table__.columns if c.name != "id"]
+
+
+def transform_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Mapeia colunas e converte data/idade/número de forma vetorizada.
+
+    CPFs são normalizados e os inválidos já entram com has_filter = true
+    e status 'invalid', para nunca chegarem à API. CPF com mais de 11
+    dígitos vira NULL: cortá-lo poderia gerar um CPF real e tomar a vaga
+    dele no índice único.
+    """
+    df = df.rename(columns=RENAME_MAP)
+
+    df["cpf"] = normalize_cpf_series(df["cpf"])
+    valid = valid_cpf_mask(df["cpf"])
+    df["cpf"] = df["cpf"].where(df["cpf"].str.len() == CPF_LENGTH, None)
+    df["has_filter"] = ~valid
+    df["status"] = valid.map({True: STATUS_PENDING, False: STATUS_INVALID})
+    invalid = int((~valid).sum())
+    if invalid:
+        logger.warning(f"{invalid}/{len(df)} CPFs inválidos marcados")
+
+    nascimento = pd.to_datetime(
+        df["data_nascimento"], errors="coerce", dayfirst=True
+    )
+    df["data_nascimento"] = nascimento.dt.strftime("%Y-%m-%d")
+    df["idade"] = pd.to_numeric(df["idade"], errors="coerce").astype("Int64")
+    if "numero" in df:
+        df["numero"] = pd.to_numeric(df["numero"], errors="coerce").astype(
+            "Int64"
+        )
+
+    return df[[c for c in VALID_COLUMNS if c in df.columns]]
+
+
+def drop_duplicate_cpfs(df: pd.DataFrame) -> pd.DataFrame:
+    """Uma linha por CPF dentro do chunk.
+
+    Fica a primeira linha válida do arquivo (has_filter = false) e, sem
+    nenhuma válida, a primeira. CPFs nulos ficam todos: não colidem no
+    índice único.
+    """
+    preferred = df.sort_values("has_filter", kind="stable")
+    duplicated = preferred["cpf"].duplicated() & preferred["cpf"].notna()
+    duplicated = duplicated.reindex(df.index)
+    if duplicated.any():
+        logger.info(f"{int(duplicated.sum())} CPFs repetidos no chunk")
+    return df[~duplicated]
+
+
+def is_deadlock(error: DBAPIError) -> bool:
+    """Deadlock do Postgres (SQLSTATE 40P01), com psycopg2 ou psycopg 3"""
+    orig = error.orig
+    code = getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)
+    return code == DEADLOCK_SQLSTATE
+
+
+def file_checksum(path: str, block_size: int = 1 << 20) -> str:
+    """sha256 do conteúdo, lido em blocos"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 
 class InjectDataBaseManager:
-    def __init__(self, file: str) -> None:
+    def __init__(self, file: str, chunksize: int = INGEST_CHUNK_SIZE) -> None:
         self.file = file
+        self.chunksize = chunksize
+
+    def _read_csv(self, **kwargs):
+        return pd.read_csv(
+            self.file, sep=";", dtype=str, encoding="latin-1", **kwargs
+        )
 
     def inject_data_base(self):
-        print("Lendo arquivo CSV...")
-        df = pd.read_csv(self.file, sep=";", dtype=str, encoding="latin-1")
+        logger.info("Lendo arquivo CSV...")
+        df = drop_duplicate_cpfs(transform_frame(self._read_csv()))
+        df = df.astype(object).where(df.notna(), None)
+
+        records = df.to_dict(orient="records")
+        try:
+            with engine.begin() as conn:
+                result = conn.execute(
+                    insert(SearchRo)
+                    .on_conflict_do_nothing(index_elements=["cpf"])
+                    .returning(SearchRo.id),
+                    records,
+                )
+                inserted = len(result.all())
+            logger.info(
+                f"{inserted} registros inseridos com sucesso "
+                f"({len(records) - inserted} CPFs já existentes)."
+            )
+        except Exception as e:
+            logger.error(f"Erro ao inserir dados: {e}")
+
+    def stream_inject_data_base(self) -> int:
+        """Lê o CSV em chunks e envia cada um para spreed.ro via COPY.
 
-        df = df.where(pd.notnull(df), None)
+        A memória fica limitada a um chunk; a carga inteira roda em uma
+        transação, como no `inject_data_base`. CPFs repetidos no chunk são
+        descartados aqui e os que já estão na tabela (ou vieram em um chunk
+        anterior) pelo ON CONFLICT da staging.
+        """
+        table = f"{SearchRo.__table__.schema}.{SearchRo.__tablename__}"
+        total = skipped = 0
+        started = time.perf_counter()
 
-        df["DATA_NASCIMENTO"] = pd.to_datetime(
-            df["DATA_NASCIMENTO"], errors="coerce", dayfirst=True
+        try:
+            with engine.begin() as conn:
+                dbapi_conn = conn.connection.dbapi_connection
+                for i, chunk in enumerate(
+                    self._read_csv(chunksize=self.chunksize)
+                ):
+                    chunk_started = time.perf_counter()
+                    frame = drop_duplicate_cpfs(transform_frame(chunk))
+                    rows = copy_insert_new(dbapi_conn, table, frame, "cpf")
+                    total += rows
+                    skipped += len(chunk) - rows
+                    elapsed = time.perf_counter() - chunk_started
+                    logger.info(
+                        f"Chunk {i}: {rows} linhas novas de {len(chunk)} em "
+                        f"{elapsed:.2f}s "
+                        f"({len(chunk) / max(elapsed, 1e-9):,.0f} linhas/s)"
+                    )
+        except Exception as e:
+            logger.error(f"Erro ao inserir dados: {e}")
+            raise
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"{total} registros inseridos em {elapsed:.1f}s "
+            f"({total / max(elapsed, 1e-9):,.0f} linhas/s); "
+            f"{skipped} CPFs repetidos ignorados"
         )
-        df["DATA_NASCIMENTO"] = df["DATA_NASCIMENTO"].apply(
-            lambda x: x.date() if pd.notnull(x) else None
+        return total
+
+    def _manifest(self, conn, checksum: str):
+        """Linha do manifesto do arquivo, criada na primeira carga"""
+        conn.execute(
+            insert(IngestManifest)
+            .values(
+                checksum=checksum,
+                path=os.path.abspath(self.file),
+                size=os.path.getsize(self.file),
+                chunksize=self.chunksize,
+                status=MANIFEST_LOADING,
+                loaded_by=f"{socket.gethostname()}:{os.getpid()}",
+            )
+            .on_conflict_do_nothing(index_elements=["checksum"])
         )
+        return conn.execute(
+            select(IngestManifest).where(IngestManifest.checksum == checksum)
+        ).one()
+
+    def resumable_inject(self) -> dict:
+        """Carga em chunks com commit por chunk, retomável.
+
+        O progresso fica em spreed.ingest_manifest, gravado na mesma
+        transação do chunk: depois de uma falha, a próxima execução pula
+        os chunks já confirmados e continua do seguinte. Um arquivo já
+        concluído (mesmo checksum) não é relido. Um advisory lock por
+        checksum impede dois processos de carregarem o mesmo arquivo.
+        """
+        table = f"{SearchRo.__table__.schema}.{SearchRo.__tablename__}"
+        checksum = file_checksum(self.file)
+        name = os.path.basename(self.file)
+        result = {"file": self.file, "checksum": checksum, "inserted": 0}
+
+        with engine.connect() as raw_conn:
+            lock_conn = raw_conn.execution_options(
+                isolation_level="AUTOCOMMIT"
+            )
+            lock_key = f"spreed.ingest_manifest:{checksum}"
+            locked = lock_conn.execute(
+                text("SELECT pg_try_advisory_lock(hashtext(:key))"),
+                {"key": lock_key},
+            ).scalar()
+            if not locked:
+                logger.warning(f"{name}: já em carga por outro processo")
+                return {**result, "status": "busy"}
+            try:
+                with engine.begin() as conn:
+                    manifest = self._manifest(conn, checksum)
+                if manifest.status == MANIFEST_DONE:
+                    logger.info(f"{name}: já carregado, ignorado")
+                    return {**result, "status": "skipped"}
+                result.update(self._load_chunks(table, manifest))
+                return result
+            finally:
+                lock_conn.execute(
+                    text("SELECT pg_advisory_unlock(hashtext(:key))"),
+                    {"key": lock_key},
+                )
+
+    def _commit_chunk(
+        self, table: str, manifest, index: int, frame, read: int
+    ) -> int:
+        """Grava um chunk e o avanço do manifesto na mesma transação.
+
+        Em deadlock o Postgres desfaz a transação inteira; o chunk é
+        tentado de novo até INGEST_DEADLOCK_RETRIES vezes.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with engine.begin() as conn:
+                    dbapi_conn = conn.connection.dbapi_connection
+                    rows = copy_insert_new(dbapi_conn, table, frame, "cpf")
+                    conn.execute(
+                        update(IngestManifest)
+                        .where(IngestManifest.checksum == manifest.checksum)
+                        .values(
+                            chunks_committed=index + 1,
+                            rows_read=IngestManifest.rows_read + read,
+                            rows_inserted=IngestManifest.rows_inserted + rows,
+                            updated_at=func.now(),
+                        )
+                    )
+                return rows
+            except DBAPIError as e:
+                if not is_deadlock(e) or attempt >= INGEST_DEADLOCK_RETRIES:
+                    raise
+                logger.warning(
+                    f"{os.path.basename(self.file)} chunk {index}: deadlock, "
+                    f"tentativa {attempt}/{INGEST_DEADLOCK_RETRIES}"
+                )
+                time.sleep(random.uniform(0, 0.5 * attempt))
+
+    def _load_chunks(self, table: str, manifest) -> dict:
+        name = os.path.basename(self.file)
+        # os offsets só valem com o mesmo tamanho de chunk da 1ª carga
+        chunksize = manifest.chunksize
+        resume_from = manifest.chunks_committed
+        if resume_from:
+            logger.info(f"{name}: retomando do chunk {resume_from}")
 
-        df["IDADE"] = pd.to_numeric(df["IDADE"], errors="coerce")
-
-        rename_map = {
-            "CPF": "cpf",
-            "NOME": "nome",
-            "SEXO": "sexo",
-            "ENDERECO": "endereco",
-            "NUMERO": "numero",
-            "COMPLEMENTO": "complemento",
-            "BAIRRO": "bairro",
-            "CIDADE": "cidade",
-            "UF": "uf",
-            "CEP": "cep",
-            "CELULAR1": "celular1",
-            "WHATSAPP1": "whatsapp1",
-            "CELULAR2": "celular2",
-            "WHATSAPP2": "whatsapp2",
-            "CELULAR3": "celular3",
-            "WHATSAPP3": "whatsapp3",
-            "FIXO1": "fixo1",
-            "FIXO2": "fixo2",
-            "FIXO3": "fixo3",
-            "DATA_NASCIMENTO": "data_nascimento",
-            "IDADE": "idade",
-            "EMAIL1": "email1",
-            "EMAIL2": "email2",
-            "EMAIL3": "email3",
-            "RENDA": "renda",
-            "NOME_MAE": "nome_mae",
-            "NOMENCLATURA_ESCOLARIDADE": "nomenclatura_escolaridade",
+        inserted = 0
+        started = time.perf_counter()
+        for i, chunk in enumerate(self._read_csv(chunksize=chunksize)):
+            if i < resume_from:
+                continue
+            frame = drop_duplicate_cpfs(transform_frame(chunk))
+            rows = self._commit_chunk(table, manifest, i, frame, len(chunk))
+            inserted += rows
+            logger.info(f"{name} chunk {i}: {rows}/{len(chunk)} linhas novas")
+
+        with engine.begin() as conn:
+            conn.execute(
+                update(IngestManifest)
+                .where(IngestManifest.checksum == manifest.checksum)
+                .values(
+                    status=MANIFEST_DONE,
+                    updated_at=func.now(),
+                    finished_at=func.now(),
+                )
+            )
+        elapsed = time.perf_counter() - started
+        logger.info(f"{name}: {inserted} registros novos em {elapsed:.1f}s")
+        return {
+            "status": "loaded",
+            "inserted": inserted,
+            "resumed_from": resume_from,
+            "seconds": round(elapsed, 2),
         }
 
-        df.rename(columns=rename_map, inplace=True)
 
-        valid_columns = set(
-            c.name for c in SearchRo.__table__.columns if c.name != "id"
-        )
-        records = [
-            {k: v for k, v in row.items() if k in valid_columns}
-            for row in df.to_dict(orient="records")
-        ]
-        try:
-            with engine.begin() as conn:
-                conn.execute(insert(SearchRo), records)
-            print(f"{len(records)} registros inseridos com sucesso.")
-        except Exception as e:
-            print("Erro ao inserir dados:", e)
+def ingest_file(path: str, chunksize: int = INGEST_CHUNK_SIZE) -> dict:
+    """Processo filho do `ingest_directory`: carrega um arquivo"""
+    return InjectDataBaseManager(path, chunksize=chunksize).resumable_inject()
+
+
+def ingest_directory(
+    directory: str,
+    processes: int = INGEST_PROCESSES,
+    chunksize: int = INGEST_CHUNK_SIZE,
+    pattern: str = INGEST_PATTERN,
+) -> list:
+    """Carrega todos os CSVs de `directory`, um arquivo por processo.
+
+    Os processos usam `spawn` (cada um abre a própria engine) e recebem
+    primeiro os maiores arquivos, para não sobrar um arquivo grande no
+    fim. Um arquivo com erro não interrompe os outros; na próxima
+    execução ele retoma do último chunk confirmado.
+    """
+    files = sorted(
+        glob.glob(os.path.join(directory, pattern)),
+        key=os.path.getsize,
+        reverse=True,
+    )
+    if not files:
+        logger.warning(f"Nenhum arquivo {pattern} em {directory}")
+        return []
+
+    started = time.perf_counter()
+    results = []
+    context = mp.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(processes, len(files)), mp_context=context
+    ) as pool:
+        futures = {
+            pool.submit(ingest_file, path, chunksize): path for path in files
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"❌ Falha na carga de {path}: {e}")
+                results.append({"file": path, "status": "failed"})
+
+    elapsed = time.perf_counter() - started
+    by_status = {}
+    for result in results:
+        by_status[result["status"]] = by_status.get(result["status"], 0) + 1
+    inserted = sum(result.get("inserted", 0) for result in results)
+    logger.info(
+        f"Carga de {directory}: {len(files)} arquivos {by_status}, "
+        f"{inserted} registros novos em {elapsed:.1f}s"
+    )
+    return results
 
 
 if __name__ == "__main__":
-    filepath = ""  # file path to csv
-    manager = InjectDataBaseManager(filepath)
-    manager.inject_data_base()
+    parser = argparse.ArgumentParser(description="Carga de leads em spreed.ro")
+    parser.add_argument(
+        "path", help="arquivo CSV (separado por ';') ou diretório de CSVs"
+    )
+    parser.add_argument("--chunksize", type=int, default=INGEST_CHUNK_SIZE)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=INGEST_PROCESSES,
+        help="arquivos carregados em paralelo (só para diretórios)",
+    )
+    parser.add_argument("--pattern", default=INGEST_PATTERN)
+    parser.add_argument(
+        "--single-transaction",
+        action="store_true",
+        help="arquivo inteiro em uma transação, sem manifesto (modo antigo)",
+    )
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="carrega o arquivo inteiro em memória (modo antigo)",
+    )
+    args = parser.parse_args()
+
+    if os.path.isdir(args.path):
+        ingest_directory(
+            args.path, args.processes, args.chunksize, args.pattern
+        )
+    else:
+        manager = InjectDataBaseManager(args.path, chunksize=args.chunksize)
+        if args.no_stream:
+            manager.inject_data_base()
+        elif args.single_transaction:
+            manager.stream_inject_data_base()
+        else:
+            manager.resumable_inject()
@@ -0,0 +1,128 @@
+"""Seleção de leads qualificados em spreed.result_search_ro.
+
+    python -m src.database.leads --min-margin 300 --situacao ATIVO
+    python -m src.database.leads --min-margin 300 --explain
+
+As consultas repetem o predicado `list_status`, então batem nos índices
+parciais em vez de varrer a tabela: com `situacao` (por igualdade) nos
+ix_result_search_ro_lead_* (migração 0008_lead_indexes), sem ela nos
+ix_result_search_ro_margin_* (0012_lead_margin_indexes).
+"""
+
+import argparse
+import os
+from decimal import Decimal
+from typing import Iterator, Optional, Sequence
+
+from sqlalchemy import or_, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from src.database.schemas import ResultSearchRo, engine
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+LEADS_SITUACAO = os.getenv("LEADS_SITUACAO", "ATIVO")
+LEADS_PAGE_SIZE = int(os.getenv("LEADS_PAGE_SIZE", "1000"))
+
+MARGIN_COLUMNS = (
+    "margem_disponivel",
+    "margem_cartao",
+    "margem_cartao_beneficio",
+)
+
+
+def qualified_leads_query(
+    min_margin: Decimal,
+    margins: Sequence[str] = MARGIN_COLUMNS,
+    situacao: Optional[str] = LEADS_SITUACAO,
+    after_id: int = 0,
+    limit: int = LEADS_PAGE_SIZE,
+):
+    """Linhas com alguma das `margins` >= `min_margin`, em ordem de id.
+
+    Com várias margens o Postgres combina os índices por BitmapOr; a
+    paginação é por id (keyset), sem OFFSET.
+    """
+    columns = [getattr(ResultSearchRo, name) for name in margins]
+    stmt = select(ResultSearchRo).where(
+        # mesmo predicado dos índices parciais (WHERE list_status)
+        ResultSearchRo.list_status,
+        or_(*(column >= min_margin for column in columns)),
+        ResultSearchRo.id > after_id,
+    )
+    if situacao is not None:
+        stmt = stmt.where(ResultSearchRo.situacao == situacao)
+    return stmt.order_by(ResultSearchRo.id).limit(limit)
+
+
+def iter_qualified_leads(
+    min_margin: Decimal,
+    margins: Sequence[str] = MARGIN_COLUMNS,
+    situacao: Optional[str] = LEADS_SITUACAO,
+    page_size: int = LEADS_PAGE_SIZE,
+    bind=engine,
+) -> Iterator[ResultSearchRo]:
+    """Percorre todos os leads qualificados, uma página por vez"""
+    after_id = 0
+    while True:
+        with Session(bind) as session:
+            page = session.scalars(
+                qualified_leads_query(
+                    min_margin, margins, situacao, after_id, page_size
+                )
+            ).all()
+        if not page:
+            return
+        yield from page
+        after_id = page[-1].id
+
+
+def explain(stmt, bind=engine) -> str:
+    """Plano de execução da consulta (EXPLAIN ANALYZE, BUFFERS)"""
+    sql = stmt.compile(
+        dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+    )
+    with bind.connect() as conn:
+        rows = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))
+        return "\n".join(row[0] for row in rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Leads qualificados")
+    parser.add_argument("--min-margin", type=Decimal, required=True)
+    parser.add_argument(
+        "--margin",
+        action="append",
+        choices=MARGIN_COLUMNS,
+        help="margem filtrada (repetível; padrão: todas)",
+    )
+    parser.add_argument(
+        "--situacao", default=LEADS_SITUACAO, help="vazio = qualquer"
+    )
+    parser.add_argument("--limit", type=int, default=LEADS_PAGE_SIZE)
+    parser.add_argument(
+        "--explain", action="store_true", help="mostra o plano da consulta"
+    )
+    args = parser.parse_args()
+
+    margins = args.margin or MARGIN_COLUMNS
+    situacao = args.situacao or None
+    stmt = qualified_leads_query(
+        args.min_margin, margins, situacao, limit=args.limit
+    )
+    if args.explain:
+        print(explain(stmt))
+    else:
+        total = 0
+        for lead in iter_qualified_leads(
+            args.min_margin, margins, situacao, page_size=args.limit
+        ):
+            print(
+                f"{lead.cpf};{lead.matricula};{lead.nome};{lead.situacao};"
+                f"{lead.margem_disponivel};{lead.margem_cartao};"
+                f"{lead.margem_cartao_beneficio}"
+            )
+            total += 1
+        logger.info(f"{total} leads com margem >= {args.min_margin}")
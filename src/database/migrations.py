@@ -0,0 +1,450 @@
+"""Migrações versionadas do schema `spreed`.
+
+    python -m src.database.migrations status
+    python -m src.database.migrations upgrade
+
+Cada migração roda uma única vez e fica registrada em
+spreed.schema_migrations. Migrações com `transactional=False` rodam em
+autocommit (necessário para CREATE INDEX CONCURRENTLY, que não bloqueia
+escritas em tabelas grandes); por isso usam sempre IF NOT EXISTS, e cada
+índice concorrente vem depois de `drop_invalid_index`.
+"""
+
+import argparse
+from typing import Callable, List, Union
+
+from sqlalchemy import text
+
+from src.database.schemas import engine
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+Step = Union[str, Callable]
+
+MIGRATIONS_LOCK_KEY = "spreed.schema_migrations"
+
+
+def drop_invalid_index(name: str, schema: str = "spreed") -> Callable:
+    """Passo que apaga `schema.name` se ele ficou INVALID.
+
+    Um CREATE INDEX CONCURRENTLY que falha no meio (duplicata no índice
+    único, cancelamento) deixa o índice criado e marcado como inválido; o
+    IF NOT EXISTS da nova tentativa o pularia e a migração passaria sem
+    índice utilizável.
+    """
+
+    def step(conn):
+        invalid = conn.execute(
+            text(
+                """
+                SELECT 1
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = :schema
+                  AND c.relname = :name
+                  AND NOT i.indisvalid
+                """
+            ),
+            {"schema": schema, "name": name},
+        ).first()
+        if invalid is not None:
+            logger.warning(f"Índice {schema}.{name} INVALID; apagando")
+            conn.execute(
+                text(f"DROP INDEX CONCURRENTLY IF EXISTS {schema}.{name}")
+            )
+
+    return step
+
+
+class Migration:
+    def __init__(
+        self,
+        version: int,
+        name: str,
+        steps: List[Step],
+        transactional: bool = True,
+    ):
+        self.version = version
+        self.name = name
+        self.steps = steps
+        self.transactional = transactional
+
+    def apply(self, conn):
+        for step in self.steps:
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(text(step))
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+MIGRATIONS = [
+    Migration(
+        1,
+        "baseline",
+        [
+            "CREATE SCHEMA IF NOT EXISTS spreed",
+            """
+            CREATE TABLE IF NOT EXISTS spreed.ro (
+                id SERIAL PRIMARY KEY,
+                nome VARCHAR(100),
+                cpf VARCHAR(11),
+                sexo VARCHAR(10),
+                endereco VARCHAR(255),
+                numero INTEGER,
+                complemento VARCHAR(255),
+                bairro VARCHAR(255),
+                cidade VARCHAR(255),
+                uf VARCHAR(2),
+                cep VARCHAR(10),
+                celular1 VARCHAR(20),
+                whatsapp1 VARCHAR(20),
+                celular2 VARCHAR(20),
+                whatsapp2 VARCHAR(20),
+                celular3 VARCHAR(20),
+                whatsapp3 VARCHAR(20),
+                fixo1 VARCHAR(20),
+                fixo2 VARCHAR(20),
+                fixo3 VARCHAR(20),
+                data_nascimento VARCHAR(10),
+                idade INTEGER,
+                email1 VARCHAR(255),
+                email2 VARCHAR(255),
+                email3 VARCHAR(255),
+                renda VARCHAR(100),
+                nome_mae VARCHAR(255),
+                nomenclatura_escolaridade VARCHAR(100),
+                has_filter BOOLEAN DEFAULT false
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS spreed.result_search_ro (
+                id SERIAL PRIMARY KEY,
+                nome VARCHAR(225),
+                matricula VARCHAR(100),
+                cpf VARCHAR(30),
+                cargo VARCHAR(225),
+                lotacao VARCHAR(255),
+                classificacao VARCHAR(255),
+                margem_disponivel VARCHAR(30),
+                margem_cartao VARCHAR(30),
+                margem_cartao_beneficio VARCHAR(30),
+                nome_cargo VARCHAR(255),
+                situacao VARCHAR(255),
+                is_pensionista VARCHAR(141),
+                list_status BOOLEAN DEFAULT false
+            )
+            """,
+        ],
+    ),
+    Migration(
+        2,
+        "lookup_indexes",
+        [
+            # update_has_filter_cpf / flush do BulkResultWriter
+            drop_invalid_index("ix_ro_cpf"),
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ro_cpf "
+            "ON spreed.ro (cpf)",
+            # iter_pending_cpfs: só as linhas ainda não consultadas
+            drop_invalid_index("ix_ro_pending_id"),
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ro_pending_id "
+            "ON spreed.ro (id) WHERE has_filter = false",
+            drop_invalid_index("ix_result_search_ro_cpf"),
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_result_search_ro_cpf "
+            "ON spreed.result_search_ro (cpf)",
+            "ANALYZE spreed.ro",
+            "ANALYZE spreed.result_search_ro",
+        ],
+        transactional=False,
+    ),
+    Migration(
+        3,
+        "work_queue",
+        [
+            # só vale enquanto has_filter = false; não precisa de backfill
+            "ALTER TABLE spreed.ro ADD COLUMN IF NOT EXISTS "
+            "status VARCHAR(16) NOT NULL DEFAULT 'pending'",
+            "ALTER TABLE spreed.ro ADD COLUMN IF NOT EXISTS "
+            "claimed_by VARCHAR(64)",
+            "ALTER TABLE spreed.ro ADD COLUMN IF NOT EXISTS "
+            "lease_expires_at TIMESTAMPTZ",
+        ],
+    ),
+    Migration(
+        4,
+        "token_lease",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS spreed.token_lease (
+                name VARCHAR(64) PRIMARY KEY,
+                access_token TEXT NOT NULL,
+                expires_at TIMESTAMPTZ NOT NULL,
+                renewed_by VARCHAR(128),
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """,
+        ],
+    ),
+    Migration(
+        5,
+        "result_content_hash",
+        [
+            "ALTER TABLE spreed.result_search_ro ADD COLUMN IF NOT EXISTS "
+            "content_hash VARCHAR(40)",
+            # mantém só a linha mais recente de cada (cpf, matricula)
+            """
+            DELETE FROM spreed.result_search_ro r
+            USING spreed.result_search_ro newer
+            WHERE r.cpf = newer.cpf
+              AND r.matricula = newer.matricula
+              AND r.id < newer.id
+            """,
+        ],
+    ),
+    Migration(
+        6,
+        "result_natural_key",
+        [
+            drop_invalid_index("uq_result_search_ro_cpf_matricula"),
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "
+            "uq_result_search_ro_cpf_matricula "
+            "ON spreed.result_search_ro (cpf, matricula)",
+            # coberto pelo prefixo (cpf) do índice único
+            "DROP INDEX CONCURRENTLY IF EXISTS spreed.ix_result_search_ro_cpf",
+            "ANALYZE spreed.result_search_ro",
+        ],
+        transactional=False,
+    ),
+    Migration(
+        7,
+        "numeric_margins",
+        [
+            """
+            CREATE OR REPLACE FUNCTION spreed.try_numeric(value TEXT)
+            RETURNS NUMERIC LANGUAGE plpgsql IMMUTABLE AS $$
+            BEGIN
+                RETURN NULLIF(trim(value), '')::numeric;
+            EXCEPTION WHEN others THEN
+                RETURN NULL;
+            END
+            $$
+            """,
+            # um único ALTER: a tabela é reescrita uma vez só. Textos que
+            # não são número (vazio, lixo antigo) viram NULL em vez de
+            # abortar a migração
+            """
+            ALTER TABLE spreed.result_search_ro
+                ALTER COLUMN margem_disponivel TYPE NUMERIC(14, 2)
+                    USING spreed.try_numeric(margem_disponivel),
+                ALTER COLUMN margem_cartao TYPE NUMERIC(14, 2)
+                    USING spreed.try_numeric(margem_cartao),
+                ALTER COLUMN margem_cartao_beneficio TYPE NUMERIC(14, 2)
+                    USING spreed.try_numeric(margem_cartao_beneficio)
+            """,
+        ],
+    ),
+    Migration(
+        8,
+        "lead_indexes",
+        [
+            *(
+                step
+                for column in (
+                    "margem_disponivel",
+                    "margem_cartao",
+                    "margem_cartao_beneficio",
+                )
+                for step in (
+                    drop_invalid_index(f"ix_result_search_ro_lead_{column}"),
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                    f"ix_result_search_ro_lead_{column} "
+                    f"ON spreed.result_search_ro (situacao, {column}) "
+                    f"WHERE list_status",
+                )
+            ),
+            "ANALYZE spreed.result_search_ro",
+        ],
+        transactional=False,
+    ),
+    Migration(
+        9,
+        "ro_unique_cpf",
+        [
+            # fica a cópia já consultada, senão a mais antiga. Rode com a
+            # carga parada: uma duplicata inserida entre o DELETE e o
+            # CREATE deixa o índice INVALID; a migração falha e, ao
+            # repeti-la, drop_invalid_index apaga o índice antes de recriar
+            """
+            DELETE FROM spreed.ro r
+            USING spreed.ro keep
+            WHERE r.cpf = keep.cpf
+              AND r.id <> keep.id
+              AND (coalesce(keep.has_filter, false), -keep.id)
+                > (coalesce(r.has_filter, false), -r.id)
+            """,
+            drop_invalid_index("uq_ro_cpf"),
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_ro_cpf "
+            "ON spreed.ro (cpf)",
+            # coberto pelo índice único
+            "DROP INDEX CONCURRENTLY IF EXISTS spreed.ix_ro_cpf",
+            "ANALYZE spreed.ro",
+        ],
+        transactional=False,
+    ),
+    Migration(
+        10,
+        "ingest_manifest",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS spreed.ingest_manifest (
+                checksum VARCHAR(64) PRIMARY KEY,
+                path TEXT NOT NULL,
+                size BIGINT NOT NULL,
+                chunksize INTEGER NOT NULL,
+                chunks_committed INTEGER NOT NULL DEFAULT 0,
+                rows_read BIGINT NOT NULL DEFAULT 0,
+                rows_inserted BIGINT NOT NULL DEFAULT 0,
+                status VARCHAR(16) NOT NULL DEFAULT 'loading',
+                loaded_by VARCHAR(128),
+                started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                finished_at TIMESTAMPTZ
+            )
+            """,
+        ],
+    ),
+    Migration(
+        11,
+        "ro_dead_letter",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS spreed.ro_dead_letter (
+                cpf VARCHAR(11) PRIMARY KEY,
+                attempts INTEGER NOT NULL,
+                last_status INTEGER,
+                last_error TEXT,
+                first_failed_at TIMESTAMPTZ,
+                dead_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """,
+        ],
+    ),
+    Migration(
+        12,
+        "lead_margin_indexes",
+        [
+            # leads sem filtro de situação (--situacao ''): os índices da
+            # 0008 começam por situacao e não servem para a faixa de margem
+            *(
+                step
+                for column in (
+                    "margem_disponivel",
+                    "margem_cartao",
+                    "margem_cartao_beneficio",
+                )
+                for step in (
+                    drop_invalid_index(f"ix_result_search_ro_margin_{column}"),
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS "
+                    f"ix_result_search_ro_margin_{column} "
+                    f"ON spreed.result_search_ro ({column}) "
+                    f"WHERE list_status",
+                )
+            ),
+            "ANALYZE spreed.result_search_ro",
+        ],
+        transactional=False,
+    ),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text("CREATE SCHEMA IF NOT EXISTS spreed"))
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS spreed.schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+    )
+
+
+def applied_versions(conn) -> set:
+    rows = conn.execute(text("SELECT version FROM spreed.schema_migrations"))
+    return {row.version for row in rows}
+
+
+def _record(conn, migration: Migration):
+    conn.execute(
+        text(
+            "INSERT INTO spreed.schema_migrations (version, name) "
+            "VALUES (:version, :name)"
+        ),
+        {"version": migration.version, "name": migration.name},
+    )
+
+
+def upgrade(bind=engine) -> list:
+    """Aplica, em ordem, as migrações ainda não registradas"""
+    applied = []
+    with bind.connect() as raw_conn:
+        conn = raw_conn.execution_options(isolation_level="AUTOCOMMIT")
+        # impede dois processos migrando ao mesmo tempo
+        conn.execute(
+            text("SELECT pg_advisory_lock(hashtext(:key))"),
+            {"key": MIGRATIONS_LOCK_KEY},
+        )
+        try:
+            _ensure_version_table(conn)
+            done = applied_versions(conn)
+
+            for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+                if migration.version in done:
+                    continue
+                logger.info(f"Aplicando migração {migration!r}")
+                if migration.transactional:
+                    with bind.begin() as tx:
+                        migration.apply(tx)
+                        _record(tx, migration)
+                else:
+                    migration.apply(conn)
+                    _record(conn, migration)
+                applied.append(migration)
+        finally:
+            conn.execute(
+                text("SELECT pg_advisory_unlock(hashtext(:key))"),
+                {"key": MIGRATIONS_LOCK_KEY},
+            )
+
+    if applied:
+        logger.info(f"{len(applied)} migração(ões) aplicada(s)")
+    else:
+        logger.info("Schema já está atualizado")
+    return applied
+
+
+def status(bind=engine):
+    with bind.begin() as conn:
+        _ensure_version_table(conn)
+        done = applied_versions(conn)
+    for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+        mark = "x" if migration.version in done else " "
+        print(f"[{mark}] {migration!r}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrações do schema spreed")
+    parser.add_argument("command", choices=["upgrade", "status"])
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        upgrade()
+    else:
+        status()
@@ -1,7 +1,21 @@
 import os
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
 
 from dotenv import load_dotenv
-from sqlalchemy import Boolean, Integer, String, create_engine
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    DateTime,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    create_engine,
+    text,
+)
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
 
 load_dotenv()
@@ -21,7 +35,17 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 class SearchRo(Base):
     __tablename__ = "ro"
-    __table_args__ = {"schema": "spreed"}
+    # índices criados pelas migrações 0002_lookup_indexes e
+    # 0009_ro_unique_cpf (um registro por CPF; alvo do ON CONFLICT da carga)
+    __table_args__ = (
+        Index("uq_ro_cpf", "cpf", unique=True),
+        Index(
+            "ix_ro_pending_id",
+            "id",
+            postgresql_where=text("has_filter = false"),
+        ),
+        {"schema": "spreed"},
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     nome: Mapped[str] = mapped_column(String(100))
@@ -52,6 +76,14 @@ class SearchRo(Base):
     nome_mae: Mapped[str] = mapped_column(String(255))
     nomenclatura_escolaridade: Mapped[str] = mapped_column(String(100))
     has_filter: Mapped[bool] = mapped_column(Boolean, default=False)
+    # fila de trabalho (migração 0003_work_queue)
+    status: Mapped[str] = mapped_column(
+        String(16), default="pending", server_default="pending"
+    )
+    claimed_by: Mapped[Optional[str]] = mapped_column(String(64))
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True)
+    )
 
     def __repr__(self):
         return f"Registred sucessfully: {self.id}"
@@ -59,7 +91,45 @@ class SearchRo(Base):
 
 class ResultSearchRo(Base):
     __tablename__ = "result_search_ro"
-    __table_args__ = {"schema": "spreed"}
+    # chave natural do upsert (0006_result_natural_key); também atende as
+    # buscas por cpf, que antes usavam ix_result_search_ro_cpf
+    __table_args__ = (
+        Index(
+            "uq_result_search_ro_cpf_matricula",
+            "cpf",
+            "matricula",
+            unique=True,
+        ),
+        # filtros de leads (0008_lead_indexes): só linhas com margem, por
+        # situação e faixa de cada margem
+        *(
+            Index(
+                f"ix_result_search_ro_lead_{column}",
+                "situacao",
+                column,
+                postgresql_where=text("list_status"),
+            )
+            for column in (
+                "margem_disponivel",
+                "margem_cartao",
+                "margem_cartao_beneficio",
+            )
+        ),
+        # leads de qualquer situação (0012_lead_margin_indexes)
+        *(
+            Index(
+                f"ix_result_search_ro_margin_{column}",
+                column,
+                postgresql_where=text("list_status"),
+            )
+            for column in (
+                "margem_disponivel",
+                "margem_cartao",
+                "margem_cartao_beneficio",
+            )
+        ),
+        {"schema": "spreed"},
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     nome: Mapped[str] = mapped_column(String(225))
@@ -68,13 +138,75 @@ class ResultSearchRo(Base):
     cargo: Mapped[str] = mapped_column(String(225))
     lotacao: Mapped[str] = mapped_column(String(255))
     classificacao: Mapped[str] = mapped_column(String(255))
-    margem_disponivel: Mapped[str] = mapped_column(String(30))
-    margem_cartao: Mapped[str] = mapped_column(String(30))
-    margem_cartao_beneficio: Mapped[str] = mapped_column(String(30))
+    # NUMERIC desde 0007_numeric_margins
+    margem_disponivel: Mapped[Decimal] = mapped_column(Numeric(14, 2))
+    margem_cartao: Mapped[Decimal] = mapped_column(Numeric(14, 2))
+    margem_cartao_beneficio: Mapped[Decimal] = mapped_column(Numeric(14, 2))
     nome_cargo: Mapped[str] = mapped_column(String(255))
     situacao: Mapped[str] = mapped_column(String(255))
     is_pensionista: Mapped[str] = mapped_column(String(141))
     list_status: Mapped[bool] = mapped_column(Boolean, default=False)
+    content_hash: Mapped[Optional[str]] = mapped_column(String(40))
 
     def __repr__(self):
         return f"Registred result search ro sucessfully: {self.id}"
+
+
+class TokenLease(Base):
+    """Token do portal compartilhado entre máquinas (0004_token_lease)"""
+
+    __tablename__ = "token_lease"
+    __table_args__ = {"schema": "spreed"}
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    access_token: Mapped[str] = mapped_column(Text)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    renewed_by: Mapped[Optional[str]] = mapped_column(String(128))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=text("now()")
+    )
+
+
+class IngestManifest(Base):
+    """Progresso da carga de cada arquivo (0010_ingest_manifest)"""
+
+    __tablename__ = "ingest_manifest"
+    __table_args__ = {"schema": "spreed"}
+
+    # sha256 do conteúdo: o mesmo arquivo com outro nome não recarrega
+    checksum: Mapped[str] = mapped_column(String(64), primary_key=True)
+    path: Mapped[str] = mapped_column(Text)
+    size: Mapped[int] = mapped_column(BigInteger)
+    chunksize: Mapped[int] = mapped_column(Integer)
+    chunks_committed: Mapped[int] = mapped_column(Integer, default=0)
+    rows_read: Mapped[int] = mapped_column(BigInteger, default=0)
+    rows_inserted: Mapped[int] = mapped_column(BigInteger, default=0)
+    status: Mapped[str] = mapped_column(String(16), default="loading")
+    loaded_by: Mapped[Optional[str]] = mapped_column(String(128))
+    started_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=text("now()")
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=text("now()")
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True)
+    )
+
+
+class RoDeadLetter(Base):
+    """CPFs que esgotaram as tentativas de consulta (0011_ro_dead_letter)"""
+
+    __tablename__ = "ro_dead_letter"
+    __table_args__ = {"schema": "spreed"}
+
+    cpf: Mapped[str] = mapped_column(String(11), primary_key=True)
+    attempts: Mapped[int] = mapped_column(Integer)
+    last_status: Mapped[Optional[int]] = mapped_column(Integer)
+    last_error: Mapped[Optional[str]] = mapped_column(Text)
+    first_failed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True)
+    )
+    dead_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=text("now()")
+    )
@@ -0,0 +1,107 @@
+import os
+import socket
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from src.core.token_manager import TokenInfo
+from src.database.schemas import TokenLease, engine
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+TOKEN_LEASE_NAME = os.getenv("TOKEN_LEASE_NAME", "ro")
+
+
+class PostgresTokenStore:
+    """Token compartilhado por todas as máquinas em spreed.token_lease.
+
+    A renovação roda sob um advisory lock por `name`: o primeiro nó faz o
+    login e grava o token; os outros ficam bloqueados no lock e, ao
+    entrar, encontram o token novo e voltam sem abrir outro login.
+    """
+
+    def __init__(
+        self, name: str = TOKEN_LEASE_NAME, node_id: str = None, bind=engine
+    ):
+        self.name = name
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.bind = bind
+
+    @property
+    def lock_key(self) -> str:
+        return f"spreed.token_lease:{self.name}"
+
+    def _read(self, conn) -> Optional[TokenInfo]:
+        row = conn.execute(
+            select(TokenLease.access_token, TokenLease.expires_at).where(
+                TokenLease.name == self.name
+            )
+        ).first()
+        if row is None:
+            return None
+        return TokenInfo(row.access_token, row.expires_at.timestamp())
+
+    def read(self) -> Optional[TokenInfo]:
+        with self.bind.connect() as conn:
+            return self._read(conn)
+
+    def _write(self, conn, info: TokenInfo):
+        values = {
+            "access_token": info.access_token,
+            "expires_at": datetime.fromtimestamp(
+                info.expires_at, timezone.utc
+            ),
+            "renewed_by": self.node_id,
+            "updated_at": datetime.now(timezone.utc),
+        }
+        conn.execute(
+            insert(TokenLease)
+            .values(name=self.name, **values)
+            .on_conflict_do_update(index_elements=["name"], set_=values)
+        )
+
+    def renew(
+        self,
+        login: Callable[[], TokenInfo],
+        stale_token: Optional[str],
+        refresh_margin: float,
+    ) -> TokenInfo:
+        """Renova o token uma vez para o cluster inteiro.
+
+        Depois de pegar o lock, relê a linha: se outro nó já trocou o
+        `stale_token` por um token ainda válido, usa esse e não faz login.
+        """
+        with self.bind.connect() as raw_conn:
+            conn = raw_conn.execution_options(isolation_level="AUTOCOMMIT")
+            started = time.perf_counter()
+            conn.execute(
+                text("SELECT pg_advisory_lock(hashtext(:key))"),
+                {"key": self.lock_key},
+            )
+            waited = time.perf_counter() - started
+            try:
+                current = self._read(conn)
+                if (
+                    current is not None
+                    and current.access_token != stale_token
+                    and current.ttl() > refresh_margin
+                ):
+                    logger.info(
+                        f"Token renovado por outro nó; lock esperado por "
+                        f"{waited * 1000:.0f} ms"
+                    )
+                    return current
+
+                info = login()
+                self._write(conn, info)
+                logger.info(f"Token publicado em token_lease ({info!r})")
+                return info
+            finally:
+                conn.execute(
+                    text("SELECT pg_advisory_unlock(hashtext(:key))"),
+                    {"key": self.lock_key},
+                )
@@ -0,0 +1,163 @@
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+from typing import Iterable, Iterator, List, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+
+from src.database.schemas import SearchRo, engine
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+WORK_QUEUE_BATCH = int(os.getenv("WORK_QUEUE_BATCH", "100"))
+WORK_QUEUE_LEASE = int(os.getenv("WORK_QUEUE_LEASE_SECONDS", "300"))
+
+STATUS_PENDING = "pending"
+STATUS_CLAIMED = "claimed"
+STATUS_DONE = "done"
+STATUS_INVALID = "invalid"
+STATUS_DEAD = "dead"
+
+
+def done_values() -> dict:
+    """Valores que tiram um CPF da fila depois de consultado"""
+    return {
+        "has_filter": True,
+        "status": STATUS_DONE,
+        "claimed_by": None,
+        "lease_expires_at": None,
+    }
+
+
+def invalid_values() -> dict:
+    """CPF com dígito verificador errado: sai da fila sem ir à rede"""
+    return {**done_values(), "status": STATUS_INVALID}
+
+
+def dead_values() -> dict:
+    """CPF que esgotou as tentativas (detalhes em spreed.ro_dead_letter)"""
+    return {**done_values(), "status": STATUS_DEAD}
+
+
+def finished_by(cpfs: Iterable[str], owner: Optional[str] = None):
+    """WHERE de quem conclui CPFs (done, invalid, dead).
+
+    Com `owner` (worker da WorkQueue) só vale para linhas ainda reservadas
+    por ele: se o lease venceu e outro worker pegou o CPF, a conclusão
+    atrasada não mexe na linha dele. Sem `owner` (CPFs paginados do
+    spreed.ro) filtra só pelo CPF.
+    """
+    clause = SearchRo.cpf.in_(list(cpfs))
+    if owner is None:
+        return clause
+    return and_(
+        clause,
+        SearchRo.status == STATUS_CLAIMED,
+        SearchRo.claimed_by == owner,
+    )
+
+
+class WorkQueue:
+    """Fila de CPFs sobre spreed.ro com claim via FOR UPDATE SKIP LOCKED.
+
+    Cada worker (processo ou máquina) reserva um lote de CPFs pendentes
+    com um lease; linhas já travadas por outro worker são puladas, então
+    nenhum CPF é consultado duas vezes em paralelo. Se o worker morrer, o
+    lease expira e o CPF volta a ser elegível.
+    """
+
+    def __init__(
+        self,
+        worker_id: str = None,
+        batch_size: int = WORK_QUEUE_BATCH,
+        lease_seconds: int = WORK_QUEUE_LEASE,
+        bind=engine,
+    ):
+        self.worker_id = worker_id or (
+            f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        )
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.bind = bind
+
+    def _lease_until(self):
+        return func.now() + timedelta(seconds=self.lease_seconds)
+
+    def claim(self, limit: int = None) -> List[str]:
+        """Reserva até `limit` CPFs pendentes (ou com lease vencido)"""
+        claimable = (
+            select(SearchRo.id)
+            .where(
+                SearchRo.has_filter.__eq__(False),
+                or_(
+                    SearchRo.status == STATUS_PENDING,
+                    and_(
+                        SearchRo.status == STATUS_CLAIMED,
+                        SearchRo.lease_expires_at < func.now(),
+                    ),
+                ),
+            )
+            .order_by(SearchRo.id)
+            .limit(limit or self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(SearchRo)
+            .where(SearchRo.id.in_(claimable.scalar_subquery()))
+            .values(
+                status=STATUS_CLAIMED,
+                claimed_by=self.worker_id,
+                lease_expires_at=self._lease_until(),
+            )
+            .returning(SearchRo.cpf)
+        )
+        with self.bind.begin() as conn:
+            return list(conn.execute(stmt).scalars())
+
+    def _owned(self, cpfs: Iterable[str]):
+        return finished_by(cpfs, self.worker_id)
+
+    def renew_lease(self, cpfs: Iterable[str]) -> int:
+        with self.bind.begin() as conn:
+            result = conn.execute(
+                update(SearchRo)
+                .where(self._owned(cpfs))
+                .values(lease_expires_at=self._lease_until())
+            )
+        return result.rowcount
+
+    def release(self, cpfs: Iterable[str]) -> int:
+        """Devolve CPFs reservados à fila sem esperar o lease vencer"""
+        with self.bind.begin() as conn:
+            result = conn.execute(
+                update(SearchRo)
+                .where(self._owned(cpfs))
+                .values(
+                    status=STATUS_PENDING,
+                    claimed_by=None,
+                    lease_expires_at=None,
+                )
+            )
+        return result.rowcount
+
+    def iter_claimed(self) -> Iterator[str]:
+        """Gera CPFs reservados em lotes até a fila esvaziar.
+
+        Se um lote demorar mais que metade do lease, o lease do restante
+        é renovado antes de seguir.
+        """
+        while True:
+            batch = self.claim()
+            if not batch:
+                logger.info(f"Fila vazia para o worker {self.worker_id}")
+                return
+
+            claimed_at = time.monotonic()
+            for i, cpf in enumerate(batch):
+                if time.monotonic() - claimed_at > self.lease_seconds / 2:
+                    self.renew_lease(batch[i:])
+                    claimed_at = time.monotonic()
+                yield cpf
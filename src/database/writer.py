@@ -0,0 +1,270 @@
+import os
+import threading
+import time
+
+from sqlalchemy import update
+
+from src.core.transform import build_result_frame, build_result_rows
+from src.database.bulk import copy_upsert_results, upsert_results
+from src.database.schemas import SearchRo, engine
+from src.database.work_queue import (
+    done_values,
+    finished_by,
+    invalid_values,
+)
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+WRITER_BATCH_SIZE = int(os.getenv("WRITER_BATCH_SIZE", "500"))
+WRITER_FLUSH_INTERVAL = float(os.getenv("WRITER_FLUSH_INTERVAL", "2.0"))
+# acima de N lotes pendentes (banco fora, flush falhando) quem enfileira
+# espera um flush dar certo em vez de crescer a memória sem limite
+WRITER_MAX_PENDING_BATCHES = int(os.getenv("WRITER_MAX_PENDING_BATCHES", "4"))
+
+
+class BulkResultWriter:
+    """Acumula resultados de vários CPFs e grava tudo em uma transação.
+
+    Cada flush faz um upsert multi-linha em result_search_ro (linhas sem
+    mudança de conteúdo não são reescritas) e marca os CPFs do lote como
+    concluídos (has_filter) em um único UPDATE. O flush
+    acontece ao atingir `batch_size` (linhas ou CPFs) ou a cada
+    `flush_interval` segundos, pela thread de fundo.
+
+    Respostas cruas (`add_raw`) são transformadas no flush, todas de uma
+    vez, por `build_result_frame`, e o frame vai direto por COPY
+    (`copy_upsert_results`). CPFs inválidos (`add_invalid`) saem da fila
+    no mesmo flush, com status 'invalid'.
+
+    Se os flushes falharem, o lote volta ao buffer; passando de
+    `max_pending_batches * batch_size`, `add`, `add_raw` e `add_invalid`
+    bloqueiam até um flush gravar (backpressure para as consultas).
+
+    Com `owner` (id do worker na WorkQueue) os CPFs só são concluídos se
+    ainda estiverem reservados por ele.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = WRITER_BATCH_SIZE,
+        flush_interval: float = WRITER_FLUSH_INTERVAL,
+        bind=engine,
+        max_pending_batches: int = WRITER_MAX_PENDING_BATCHES,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.bind = bind
+        self.max_pending = max_pending_batches * batch_size
+        self.owner = None
+
+        self._lock = threading.Lock()
+        # avisado a cada flush gravado; quem espera por espaço dorme nele
+        self._drained = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._rows: list = []
+        self._payloads: list = []
+        self._cpfs: list = []
+        self._invalid: list = []
+
+        self.flushes = 0
+        self.rows_written = 0
+        self.rows_unchanged = 0
+        self.cpfs_written = 0
+        self.cpfs_invalid = 0
+        self.total_flush_time = 0.0
+        self.max_flush_time = 0.0
+        self.last_flush_time = 0.0
+        self.backpressure_waits = 0
+        self.backpressure_seconds = 0.0
+
+        self._stop = threading.Event()
+        self._timer = threading.Thread(
+            target=self._flush_periodically, name="bulk-writer", daemon=True
+        )
+        self._timer.start()
+
+    def _pending(self) -> int:
+        return max(
+            len(self._rows) + len(self._payloads),
+            len(self._cpfs),
+            len(self._invalid),
+        )
+
+    def _wait_for_room(self):
+        """Chamado com `_lock`: espera o buffer voltar abaixo do limite"""
+        if self._pending() < self.max_pending or self._stop.is_set():
+            return
+        started = time.perf_counter()
+        logger.warning(
+            f"Writer com {self._pending()} itens pendentes; aguardando flush"
+        )
+        self._drained.wait_for(
+            lambda: self._pending() < self.max_pending or self._stop.is_set()
+        )
+        self.backpressure_waits += 1
+        self.backpressure_seconds += time.perf_counter() - started
+
+    def _flush_accepted(self):
+        """Flush disparado por um add: o item já está no buffer.
+
+        Se falhar, o lote volta ao buffer e sai num flush seguinte (thread
+        de fundo, backpressure); o erro não sobe para quem enfileirou, que
+        senão contaria como falha do CPF algo que ainda vai ser gravado.
+        """
+        try:
+            self.flush()
+        except Exception:
+            pass  # já logado pelo flush
+
+    def add(self, cpf: str, rows: list):
+        """Enfileira as linhas de um CPF (lista vazia só marca has_filter)"""
+        with self._lock:
+            self._wait_for_room()
+            self._cpfs.append(cpf.replace(".", "").replace("-", ""))
+            self._rows.extend(rows)
+            full = (
+                len(self._rows) >= self.batch_size
+                or len(self._cpfs) >= self.batch_size
+            )
+        if full:
+            self._flush_accepted()
+
+    def add_raw(self, cpf: str, data):
+        """Enfileira a resposta crua de um CPF; a transformação fica para
+        o flush"""
+        with self._lock:
+            self._wait_for_room()
+            self._cpfs.append(cpf.replace(".", "").replace("-", ""))
+            if data:
+                self._payloads.append((cpf, data))
+            full = (
+                len(self._rows) + len(self._payloads) >= self.batch_size
+                or len(self._cpfs) >= self.batch_size
+            )
+        if full:
+            self._flush_accepted()
+
+    def add_invalid(self, cpf: str):
+        """Marca um CPF inválido sem consultá-lo"""
+        with self._lock:
+            self._wait_for_room()
+            self._invalid.append(cpf)
+            full = len(self._invalid) >= self.batch_size
+        if full:
+            self._flush_accepted()
+
+    def _transform(self, payloads: list):
+        """(frame, rows): o frame do lote inteiro ou, se algum payload
+        fora do padrão derrubar a versão em lote, as linhas item a item"""
+        try:
+            return build_result_frame(payloads), []
+        except Exception as e:
+            # um payload fora do padrão não pode travar o lote inteiro
+            logger.warning(f"Transformação em lote falhou ({e}); item a item")
+        rows = []
+        for cpf, data in payloads:
+            try:
+                rows.extend(build_result_rows(data, cpf))
+            except Exception as e:
+                logger.error(f"❌ Resposta do CPF {cpf} ignorada: {e}")
+        return None, rows
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows, payloads, cpfs = self._rows, self._payloads, self._cpfs
+                self._rows, self._payloads, self._cpfs = [], [], []
+                invalid, self._invalid = self._invalid, []
+            if not cpfs and not invalid:
+                return
+
+            started = time.perf_counter()
+            written, total = 0, len(rows)
+            try:
+                frame, fallback = None, []
+                if payloads:
+                    frame, fallback = self._transform(payloads)
+                    total += len(fallback) if frame is None else len(frame)
+                with self.bind.begin() as conn:
+                    if rows or fallback:
+                        written = upsert_results(conn, rows + fallback)
+                    if frame is not None and not frame.empty:
+                        written += copy_upsert_results(
+                            conn.connection.dbapi_connection, frame
+                        )
+                    if cpfs:
+                        conn.execute(
+                            update(SearchRo)
+                            .where(finished_by(cpfs, self.owner))
+                            .values(**done_values())
+                        )
+                    if invalid:
+                        conn.execute(
+                            update(SearchRo)
+                            .where(finished_by(invalid, self.owner))
+                            .values(**invalid_values())
+                        )
+            except Exception as e:
+                # devolve o lote ao buffer para a próxima tentativa
+                with self._lock:
+                    self._rows[:0] = rows
+                    self._payloads[:0] = payloads
+                    self._cpfs[:0] = cpfs
+                    self._invalid[:0] = invalid
+                logger.error(f"❌ Erro no flush de {len(cpfs)} CPFs: {e}")
+                raise
+
+            elapsed = time.perf_counter() - started
+            self.flushes += 1
+            self.rows_written += written
+            self.rows_unchanged += total - written
+            self.cpfs_written += len(cpfs)
+            self.cpfs_invalid += len(invalid)
+            self.total_flush_time += elapsed
+            self.last_flush_time = elapsed
+            self.max_flush_time = max(self.max_flush_time, elapsed)
+            logger.info(
+                f"✅ Flush: {written}/{total} resultados gravados de "
+                f"{len(cpfs)} CPFs em {elapsed * 1000:.1f} ms"
+            )
+            with self._lock:
+                self._drained.notify_all()
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                pass  # já logado; o lote volta no próximo ciclo
+
+    def stats(self) -> dict:
+        """Estatísticas de latência dos flushes (em ms)"""
+        with self._lock:
+            pending = len(self._cpfs)
+        return {
+            "flushes": self.flushes,
+            "rows": self.rows_written,
+            "rows_unchanged": self.rows_unchanged,
+            "cpfs": self.cpfs_written,
+            "invalid_cpfs": self.cpfs_invalid,
+            "pending_cpfs": pending,
+            "avg_flush_ms": round(
+                self.total_flush_time / self.flushes * 1000
+                if self.flushes
+                else 0.0,
+                2,
+            ),
+            "max_flush_ms": round(self.max_flush_time * 1000, 2),
+            "last_flush_ms": round(self.last_flush_time * 1000, 2),
+            "backpressure_waits": self.backpressure_waits,
+            "backpressure_s": round(self.backpressure_seconds, 2),
+        }
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            self._drained.notify_all()  # ninguém fica preso no add
+        self._timer.join()
+        self.flush()
+        logger.info(f"Bulk writer encerrado: {self.stats()}")
@@ -1,4 +1,6 @@
 # src/models/models.py
+from decimal import Decimal
+
 from pydantic import BaseModel
 
 
@@ -9,6 +11,6 @@ class ServidorSchema(BaseModel):
     cargo: str
     lotacao: str
     classificacao: str
-    margem_disponivel: str
-    margem_cartao: str
-    margem_cartao_beneficio: str
+    margem_disponivel: Decimal
+    margem_cartao: Decimal
+    margem_cartao_beneficio: Decimal
@@ -0,0 +1,203 @@
+import os
+import queue
+import threading
+import time
+from typing import Callable, Iterable, List
+
+from src.api import ExtractTransformLoad
+from src.core.transform import build_result_rows
+from src.database.writer import BulkResultWriter
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+PIPELINE_FETCHERS = int(os.getenv("PIPELINE_FETCHERS", "16"))
+PIPELINE_TRANSFORMERS = int(os.getenv("PIPELINE_TRANSFORMERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "1000"))
+PIPELINE_MONITOR_INTERVAL = float(
+    os.getenv("PIPELINE_MONITOR_INTERVAL", "10")
+)
+
+_DONE = object()
+
+
+class Stage:
+    """Um estágio: `workers` threads lendo de `inbox` e escrevendo em
+    `outbox` (None no último estágio)"""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable,
+        workers: int,
+        inbox: queue.Queue,
+        outbox: queue.Queue = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.inbox = inbox
+        self.outbox = outbox
+        self.processed = 0
+        self.dropped = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is _DONE:
+                return
+            started = time.perf_counter()
+            try:
+                result = self.handler(item)
+            except Exception as e:
+                logger.error(f"Erro no estágio {self.name}: {e}")
+                result = None
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.busy_seconds += elapsed
+                if result is None:
+                    self.dropped += 1
+                else:
+                    self.processed += 1
+            if result is not None and self.outbox is not None:
+                # bloqueia quando o próximo estágio está atrasado
+                self.outbox.put(result)
+
+    def start(self):
+        self._threads = [
+            threading.Thread(
+                target=self._run, name=f"{self.name}-{i}", daemon=True
+            )
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def join(self):
+        """Espera o estágio esvaziar a fila de entrada e encerrar"""
+        for _ in self._threads:
+            self.inbox.put(_DONE)
+        for thread in self._threads:
+            thread.join()
+
+    def utilization(self, elapsed: float) -> float:
+        return self.busy_seconds / max(elapsed * self.workers, 1e-9)
+
+
+class StagedPipeline:
+    """fetch -> transform -> write, ligados por filas limitadas.
+
+    Cada estágio tem seu número de threads; filas cheias seguram o estágio
+    anterior (backpressure), então um commit lento não acumula memória, só
+    reduz o ritmo das consultas. O monitor loga a profundidade das filas e
+    quanto cada estágio ficou ocupado: o gargalo é o estágio perto de 100%
+    com a fila de entrada cheia.
+    """
+
+    monitor_interval = PIPELINE_MONITOR_INTERVAL
+
+    def __init__(
+        self,
+        etl: ExtractTransformLoad,
+        writer: BulkResultWriter,
+        fetchers: int = PIPELINE_FETCHERS,
+        transformers: int = PIPELINE_TRANSFORMERS,
+        queue_size: int = PIPELINE_QUEUE_SIZE,
+    ):
+        self.etl = etl
+        self.writer = writer
+
+        self.cpf_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.response_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.rows_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+
+        self.stages = [
+            Stage(
+                "fetch",
+                self._fetch,
+                fetchers,
+                self.cpf_queue,
+                self.response_queue,
+            ),
+            Stage(
+                "transform",
+                self._transform,
+                transformers,
+                self.response_queue,
+                self.rows_queue,
+            ),
+            # um só escritor: o BulkResultWriter já agrupa em lotes
+            Stage("write", self._write, 1, self.rows_queue),
+        ]
+
+    def _fetch(self, cpf: str):
+        if self.etl.reject_invalid(cpf):
+            return None  # já marcado; conta como descartado no estágio
+        data = self.etl.fetch_cpf(cpf)
+        return None if data is None else (cpf, data)
+
+    def _transform(self, item):
+        cpf, data = item
+        return cpf, build_result_rows(data, cpf) if data else []
+
+    def _write(self, item):
+        cpf, rows = item
+        self.writer.add(cpf, rows)
+        return cpf
+
+    def _log_status(self, elapsed: float):
+        depth = (
+            f"filas cpf={self.cpf_queue.qsize()} "
+            f"respostas={self.response_queue.qsize()} "
+            f"linhas={self.rows_queue.qsize()}"
+        )
+        stages = ", ".join(
+            f"{s.name}[{s.workers}] {s.processed} ok/{s.dropped} falhas "
+            f"{s.utilization(elapsed):.0%} ocupado"
+            for s in self.stages
+        )
+        written = self.stages[-1].processed
+        logger.info(
+            f"Pipeline {elapsed:.0f}s: {depth} | {stages} | "
+            f"{written / max(elapsed, 1e-9):.1f} CPF/s"
+        )
+
+    def _monitor(self, started: float, stop: threading.Event):
+        while not stop.wait(self.monitor_interval):
+            self._log_status(time.perf_counter() - started)
+
+    def run(self, cpfs: Iterable[str]) -> dict:
+        started = time.perf_counter()
+        stop = threading.Event()
+        monitor = threading.Thread(
+            target=self._monitor,
+            args=(started, stop),
+            name="pipeline-monitor",
+            daemon=True,
+        )
+        for stage in self.stages:
+            stage.start()
+        monitor.start()
+
+        try:
+            for cpf in cpfs:
+                self.cpf_queue.put(cpf)
+        finally:
+            # encerra na ordem: cada estágio drena antes do seguinte
+            for stage in self.stages:
+                stage.join()
+            stop.set()
+
+        elapsed = time.perf_counter() - started
+        self._log_status(elapsed)
+        return {
+            stage.name: {
+                "processed": stage.processed,
+                "failed": stage.dropped,
+                "utilization": round(stage.utilization(elapsed), 3),
+            }
+            for stage in self.stages
+        }
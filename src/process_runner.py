@@ -0,0 +1,161 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+from src.log.logger import setup_logger
+
+logger = setup_logger()
+
+ETL_PROCESSES = int(os.getenv("ETL_PROCESSES", str(os.cpu_count() or 1)))
+PROGRESS_INTERVAL = float(os.getenv("ETL_PROGRESS_INTERVAL", "10"))
+
+
+def _report_progress(etl, shard, progress, stop: threading.Event):
+    while not stop.wait(PROGRESS_INTERVAL):
+        progress.put((shard, etl.processed, etl.failed, False))
+
+
+def run_shard(
+    shard: int, shards: int, concurrency: int, progress, source: str
+):
+    """Processo filho: consulta só os CPFs do shard `shard` de `shards`.
+
+    Roda com `spawn`, então engine, pool HTTP, writer e rate limiter são
+    criados aqui dentro; nada é herdado do processo pai. Os limites do
+    rate limiter são divididos entre os shards para o total não mudar.
+    Com `source="queue"` cada filho é um worker da WorkQueue (SKIP
+    LOCKED já separa os CPFs) em vez de paginar o próprio shard.
+    """
+    from src.async_api import AsyncExtractTransformLoad
+    from src.core.rate_limiter import (
+        RATE_LIMIT_INITIAL,
+        RATE_LIMIT_MAX,
+        RATE_LIMIT_MIN,
+        AdaptiveRateLimiter,
+    )
+    from src.database.writer import BulkResultWriter
+
+    limiter = AdaptiveRateLimiter(
+        initial_rate=RATE_LIMIT_INITIAL / shards,
+        min_rate=RATE_LIMIT_MIN / shards,
+        max_rate=RATE_LIMIT_MAX / shards,
+    )
+    writer = BulkResultWriter()
+    etl = AsyncExtractTransformLoad(
+        concurrency=concurrency, rate_limiter=limiter, writer=writer
+    )
+    etl.load_token()
+
+    stop = threading.Event()
+    reporter = threading.Thread(
+        target=_report_progress,
+        args=(etl, shard, progress, stop),
+        daemon=True,
+    )
+    reporter.start()
+    if source == "queue":
+        from src.database.work_queue import WorkQueue
+
+        etl.use_work_queue(WorkQueue())
+        cpfs = etl.work_queue.iter_claimed()
+    else:
+        cpfs = etl.iter_pending_cpfs(shard=shard, shards=shards)
+    try:
+        etl.run_etl(cpfs)
+    finally:
+        stop.set()
+        etl.close()
+        writer.close()
+        progress.put((shard, etl.processed, etl.failed, True))
+
+
+class ShardedRunner:
+    """Distribui os CPFs pendentes entre `processes` processos.
+
+    Cada CPF cai sempre no mesmo shard (hashtext(cpf) módulo N, ver
+    `shard_of`), então os processos não disputam linhas. O pai só agrega
+    o progresso enviado pelos filhos e loga a vazão total. Com
+    `source="queue"` os filhos reservam CPFs da WorkQueue.
+    """
+
+    def __init__(
+        self,
+        processes: int = ETL_PROCESSES,
+        concurrency: int = 50,
+        source: str = "pending",
+    ):
+        self.processes = processes
+        self.concurrency = concurrency
+        self.source = source
+
+    def run(self) -> dict:
+        ctx = mp.get_context("spawn")
+        progress = ctx.Queue()
+        workers = [
+            ctx.Process(
+                target=run_shard,
+                args=(
+                    shard,
+                    self.processes,
+                    self.concurrency,
+                    progress,
+                    self.source,
+                ),
+                name=f"etl-shard-{shard}",
+            )
+            for shard in range(self.processes)
+        ]
+        for worker in workers:
+            worker.start()
+        logger.info(
+            f"{self.processes} processos iniciados "
+            f"({self.concurrency} consultas em voo cada)"
+        )
+
+        totals = {shard: (0, 0) for shard in range(self.processes)}
+        finished = set()
+        started = time.perf_counter()
+        last_log = started
+
+        while len(finished) < self.processes:
+            try:
+                shard, processed, failed, done = progress.get(timeout=1)
+                totals[shard] = (processed, failed)
+                if done:
+                    finished.add(shard)
+            except queue.Empty:
+                pass
+
+            # processo que morreu sem mandar o relatório final
+            for shard, worker in enumerate(workers):
+                if shard in finished or worker.is_alive():
+                    continue
+                if worker.exitcode != 0:
+                    logger.error(
+                        f"Shard {shard} terminou com código {worker.exitcode}"
+                    )
+                    finished.add(shard)
+
+            now = time.perf_counter()
+            if now - last_log >= PROGRESS_INTERVAL:
+                last_log = now
+                self._log_progress(totals, now - started)
+
+        for worker in workers:
+            worker.join()
+
+        summary = self._log_progress(totals, time.perf_counter() - started)
+        summary["exitcodes"] = [w.exitcode for w in workers]
+        return summary
+
+    def _log_progress(self, totals: dict, elapsed: float) -> dict:
+        processed = sum(p for p, _ in totals.values())
+        failed = sum(f for _, f in totals.values())
+        rate = (processed + failed) / max(elapsed, 1e-9)
+        logger.info(
+            f"Progresso: {processed} ok, {failed} falhas em {elapsed:.1f}s "
+            f"({rate:.1f} CPF/s, {self.processes} processos)"
+        )
+        return {"processed": processed, "failed": failed, "elapsed": elapsed}
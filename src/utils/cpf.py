@@ -0,0 +1,72 @@
+"""Normalização e dígitos verificadores de CPF.
+
+Versões escalares (uma consulta por vez, no ETL) e vetorizadas (chunks
+do CSV, na carga) com a mesma regra: só dígitos, zeros à esquerda até 11,
+sequências repetidas (000... 999...) inválidas.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+CPF_LENGTH = 11
+
+_NON_DIGITS = re.compile(r"\D")
+_WEIGHTS_1 = np.arange(10, 1, -1)  # 10..2 sobre os 9 primeiros dígitos
+_WEIGHTS_2 = np.arange(11, 1, -1)  # 11..2 sobre os 10 primeiros dígitos
+
+
+def normalize_cpf(value) -> str:
+    """Só os dígitos, com zeros à esquerda (planilhas perdem o zero)"""
+    digits = _NON_DIGITS.sub("", str(value or ""))
+    return digits.zfill(CPF_LENGTH) if digits else ""
+
+
+def _check_digit(digits: list, weights: range) -> int:
+    return sum(d * w for d, w in zip(digits, weights)) * 10 % 11 % 10
+
+
+def complete_cpf(base: str) -> str:
+    """Acrescenta os dois dígitos verificadores a 9 dígitos"""
+    digits = [int(c) for c in str(base).zfill(9)[:9]]
+    digits.append(_check_digit(digits, range(10, 1, -1)))
+    digits.append(_check_digit(digits, range(11, 1, -1)))
+    return "".join(map(str, digits))
+
+
+def is_valid_cpf(value) -> bool:
+    """Confere tamanho e os dois dígitos verificadores"""
+    cpf = normalize_cpf(value)
+    if len(cpf) != CPF_LENGTH or cpf == cpf[0] * CPF_LENGTH:
+        return False
+    digits = [int(c) for c in cpf]
+    return (
+        _check_digit(digits[:9], range(10, 1, -1)) == digits[9]
+        and _check_digit(digits[:10], range(11, 1, -1)) == digits[10]
+    )
+
+
+def normalize_cpf_series(values: pd.Series) -> pd.Series:
+    """`normalize_cpf` por coluna"""
+    digits = values.fillna("").astype(str).str.replace(r"\D", "", regex=True)
+    return digits.where(digits == "", digits.str.zfill(CPF_LENGTH))
+
+
+def valid_cpf_mask(cpfs: pd.Series) -> pd.Series:
+    """Máscara booleana de CPFs válidos para uma coluna já normalizada.
+
+    Os 11 dígitos viram uma matriz uint8 (N x 11) e os verificadores
+    saem de dois produtos matriciais, sem laço em Python por linha.
+    """
+    sized = cpfs.str.len() == CPF_LENGTH
+    padded = cpfs.where(sized, "0" * CPF_LENGTH).to_numpy(dtype="S11")
+    digits = padded.view(np.uint8).reshape(-1, CPF_LENGTH) - ord("0")
+    digits = digits.astype(np.int64)
+
+    first = (digits[:, :9] @ _WEIGHTS_1) * 10 % 11 % 10
+    second = (digits[:, :10] @ _WEIGHTS_2) * 10 % 11 % 10
+    repeated = (digits == digits[:, :1]).all(axis=1)
+
+    valid = (first == digits[:, 9]) & (second == digits[:, 10]) & ~repeated
+    return pd.Series(valid, index=cpfs.index) & sized
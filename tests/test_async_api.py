@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+from benchmarks.mock_ro_server import fake_cpf, serve_in_background
+from src.async_api import AsyncExtractTransformLoad
+from src.core.rate_limiter import AdaptiveRateLimiter
+
+CPFS = 20
+
+
+class RecordingEtl(AsyncExtractTransformLoad):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.handled = []
+
+    def handle_result(self, cpf, data):
+        self.handled.append(cpf)
+
+
+@pytest.fixture(scope="module")
+def route():
+    server, route = serve_in_background(latency=0)
+    yield route
+    server.shutdown()
+
+
+def test_cpf_source_runs_off_the_event_loop(route):
+    loop_threads = set()
+
+    def pages():
+        # como iter_pending_cpfs: cada página é uma consulta síncrona
+        for i in range(CPFS):
+            loop_threads.add(threading.current_thread())
+            yield fake_cpf(i)
+
+    etl = RecordingEtl(
+        concurrency=4,
+        rate_limiter=AdaptiveRateLimiter(initial_rate=1e6, max_rate=1e6),
+    )
+    etl.base_url, etl.token = route, "test"
+
+    etl.run_etl(pages())
+
+    assert threading.main_thread() not in loop_threads
+    assert sorted(etl.handled) == sorted(fake_cpf(i) for i in range(CPFS))
+    assert etl.failed == 0
@@ -0,0 +1,69 @@
+import pandas as pd
+import pytest
+
+from src.utils.cpf import (
+    complete_cpf,
+    is_valid_cpf,
+    normalize_cpf,
+    normalize_cpf_series,
+    valid_cpf_mask,
+)
+
+VALID = "12345678909"
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ("123.456.789-09", VALID),
+        (12345678909, VALID),
+        ("5678909", "00005678909"),
+        ("", ""),
+        (None, ""),
+        ("abc", ""),
+    ],
+)
+def test_normalize_cpf(value, expected):
+    assert normalize_cpf(value) == expected
+
+
+def test_complete_cpf():
+    assert complete_cpf("123456789") == VALID
+    assert is_valid_cpf(complete_cpf("1"))
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        (VALID, True),
+        ("123.456.789-09", True),
+        ("12345678900", False),
+        ("11111111111", False),
+        ("00000000000", False),
+        ("123456789095", False),
+        ("", False),
+    ],
+)
+def test_is_valid_cpf(value, expected):
+    assert is_valid_cpf(value) is expected
+
+
+def test_series_matches_scalar():
+    values = pd.Series(
+        [
+            "123.456.789-09",
+            "12345678900",
+            "11111111111",
+            "123456789095",
+            "5678909",
+            complete_cpf("987654321"),
+            None,
+            "",
+        ]
+    )
+
+    normalized = normalize_cpf_series(values)
+    mask = valid_cpf_mask(normalized)
+
+    assert normalized.tolist() == [normalize_cpf(v) for v in values]
+    assert mask.tolist() == [is_valid_cpf(v) for v in values]
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from src.database.etl import drop_duplicate_cpfs, is_deadlock, transform_frame
+
+VALID = "12345678909"
+
+
+def _frame(cpfs):
+    return pd.DataFrame(
+        {
+            "CPF": cpfs,
+            "NOME": [f"nome {i}" for i in range(len(cpfs))],
+            "DATA_NASCIMENTO": ["01/02/1990"] * len(cpfs),
+            "IDADE": ["34"] * len(cpfs),
+        },
+        dtype=str,
+    )
+
+
+def test_overlong_cpf_is_not_truncated():
+    df = transform_frame(_frame(["123456789095", VALID]))
+
+    assert df["cpf"].tolist() == [None, VALID]
+    assert df["has_filter"].tolist() == [True, False]
+    assert df["status"].tolist() == ["invalid", "pending"]
+
+
+def test_overlong_cpf_does_not_shadow_real_one():
+    df = drop_duplicate_cpfs(transform_frame(_frame(["123456789095", VALID])))
+
+    assert df.loc[df["cpf"] == VALID, "nome"].tolist() == ["nome 1"]
+
+
+def test_dedupe_prefers_valid_rows():
+    df = pd.DataFrame(
+        {
+            "cpf": [VALID, VALID, VALID, None, None],
+            "nome": ["a", "b", "c", "d", "e"],
+            "has_filter": [True, False, False, True, True],
+        }
+    )
+
+    kept = drop_duplicate_cpfs(df)
+
+    # a primeira válida fica, no lugar original; nulos não colidem
+    assert kept["nome"].tolist() == ["b", "d", "e"]
+
+
+class _PgError(Exception):
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+@pytest.mark.parametrize(
+    ("pgcode", "expected"), [("40P01", True), ("23505", False), (None, False)]
+)
+def test_is_deadlock(pgcode, expected):
+    error = OperationalError("INSERT", {}, _PgError(pgcode))
+
+    assert is_deadlock(error) is expected
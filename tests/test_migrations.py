@@ -0,0 +1,49 @@
+import re
+
+import pytest
+
+from src.database.migrations import MIGRATIONS, drop_invalid_index
+
+CONCURRENT_INDEX = re.compile(
+    r"CREATE (?:UNIQUE )?INDEX CONCURRENTLY IF NOT EXISTS (\w+)"
+)
+
+
+class FakeConn:
+    def __init__(self, invalid: bool):
+        self.invalid = invalid
+        self.statements = []
+
+    def execute(self, stmt, params=None):
+        self.statements.append((str(stmt), params))
+        return self
+
+    def first(self):
+        return (1,) if self.invalid else None
+
+
+@pytest.mark.parametrize("migration", MIGRATIONS, ids=repr)
+def test_concurrent_indexes_drop_invalid_first(migration):
+    for i, step in enumerate(migration.steps):
+        if not isinstance(step, str):
+            continue
+        match = CONCURRENT_INDEX.search(step)
+        if match is None:
+            continue
+        assert not migration.transactional
+        conn = FakeConn(invalid=False)
+        migration.steps[i - 1](conn)
+        [(_, params)] = conn.statements
+        assert params["name"] == match.group(1)
+
+
+def test_drop_invalid_index_drops_only_invalid():
+    valid, invalid = FakeConn(invalid=False), FakeConn(invalid=True)
+
+    drop_invalid_index("uq_ro_cpf")(valid)
+    drop_invalid_index("uq_ro_cpf")(invalid)
+
+    assert len(valid.statements) == 1
+    assert invalid.statements[-1][0] == (
+        "DROP INDEX CONCURRENTLY IF EXISTS spreed.uq_ro_cpf"
+    )
@@ -0,0 +1,182 @@
+import random
+import time
+
+import pytest
+
+import main
+from src.core.retry import RetryScheduler
+
+MAX_ATTEMPTS = 3
+LATE = 60
+
+
+class FakeEtl:
+    """ETL mínimo para o process_loop: respostas roteirizadas por CPF"""
+
+    def __init__(self, script):
+        self.script = {cpf: list(results) for cpf, results in script.items()}
+        self.calls = []
+        self.released = []
+        self.tokens_loaded = 0
+        self.owner = None
+
+    def get_request(self, cpf):
+        self.calls.append(cpf)
+        result = self.script[cpf].pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def last_failure(self):
+        return 503, "indisponível"
+
+    def load_token(self):
+        self.tokens_loaded += 1
+
+    def release_claims(self, cpfs):
+        self.released.extend(cpfs)
+        return len(cpfs)
+
+
+class CeilingRng:
+    """Sorteio sempre no teto do backoff"""
+
+    def uniform(self, low, high):
+        return high
+
+
+@pytest.fixture
+def scheduler():
+    # atraso zero: os testes não esperam o backoff
+    return RetryScheduler(max_attempts=MAX_ATTEMPTS, base_delay=0, max_delay=0)
+
+
+@pytest.fixture
+def dead_letters(monkeypatch):
+    moved = []
+    monkeypatch.setattr(
+        main,
+        "move_to_dead_letter",
+        lambda item, owner=None: moved.append(item),
+    )
+    return moved
+
+
+def test_backoff_is_capped_full_jitter():
+    scheduler = RetryScheduler(
+        base_delay=2, max_delay=10, rng=random.Random(42)
+    )
+    for attempts, ceiling in [(1, 2), (2, 4), (3, 8), (4, 10), (10, 10)]:
+        delays = [scheduler.backoff(attempts) for _ in range(200)]
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert max(delays) > ceiling / 2
+
+
+def test_fail_reschedules_until_exhausted(scheduler):
+    assert scheduler.fail("1", 500, "erro") is None
+    assert scheduler.fail("1", 502, "erro") is None
+    item = scheduler.fail("1", 503, "último")
+
+    assert item.attempts == MAX_ATTEMPTS
+    assert (item.last_status, item.last_error) == (503, "último")
+    assert item.first_failed_at is not None
+    assert scheduler.item("1") is None
+    assert scheduler.stats() == {"waiting": 2, "retried": 2, "dead": 1}
+
+
+def test_pop_due_respects_delay_and_order(scheduler):
+    scheduler.defer("late", LATE)
+    scheduler.defer("a")
+    scheduler.defer("b")
+
+    assert [scheduler.pop_due(), scheduler.pop_due()] == ["a", "b"]
+    assert scheduler.pop_due() is None
+    assert 0 < scheduler.next_due_in() <= LATE
+    assert scheduler.waiting() == ["late"]
+    assert len(scheduler) == 1
+
+
+def test_succeed_forgets_attempts(scheduler):
+    scheduler.fail("1")
+    scheduler.succeed("1")
+
+    assert scheduler.item("1") is None
+    assert scheduler.fail("1") is None  # recomeça da tentativa 1
+
+
+def test_empty_scheduler():
+    scheduler = RetryScheduler()
+
+    assert scheduler.pop_due() is None
+    assert scheduler.next_due_in() == 0.0
+    assert not scheduler
+
+
+def test_process_loop_retries_and_keeps_going(dead_letters):
+    scheduler = RetryScheduler(
+        max_attempts=MAX_ATTEMPTS,
+        base_delay=0.05,
+        max_delay=0.05,
+        rng=CeilingRng(),
+    )
+    etl = FakeEtl({"1": [None, None, ["ok"]], "2": [["ok"]], "3": [[]]})
+
+    main.process_loop(etl, ["1", "2", "3"], scheduler)
+
+    # o CPF com falha não segurou os outros
+    assert etl.calls[:3] == ["1", "2", "3"]
+    assert etl.calls.count("1") == MAX_ATTEMPTS
+    assert dead_letters == []
+    assert scheduler.stats() == {"waiting": 0, "retried": 2, "dead": 0}
+    assert etl.released == []
+
+
+def test_process_loop_dead_letters_after_max_attempts(scheduler, dead_letters):
+    etl = FakeEtl({"1": [None, RuntimeError("boom"), None], "2": [["ok"]]})
+
+    main.process_loop(etl, ["1", "2"], scheduler)
+
+    [item] = dead_letters
+    assert item.cpf == "1"
+    assert item.attempts == MAX_ATTEMPTS
+    assert (item.last_status, item.last_error) == (503, "indisponível")
+    assert etl.calls.count("1") == MAX_ATTEMPTS
+
+
+def test_process_loop_missing_token_is_not_an_attempt(scheduler, dead_letters):
+    etl = FakeEtl({"1": [ValueError("Token not loaded"), ["ok"]]})
+
+    main.process_loop(etl, ["1"], scheduler)
+
+    assert etl.tokens_loaded == 1
+    assert scheduler.stats()["retried"] == 0
+    assert dead_letters == []
+
+
+def test_process_loop_releases_when_dead_letter_fails(monkeypatch, scheduler):
+    def broken(item, owner=None):
+        raise ConnectionError("banco fora")
+
+    monkeypatch.setattr(main, "move_to_dead_letter", broken)
+    etl = FakeEtl({"1": [None] * MAX_ATTEMPTS})
+
+    main.process_loop(etl, ["1"], scheduler)
+
+    assert etl.released == ["1"]
+
+
+def test_process_loop_releases_waiting_cpfs_on_interrupt(dead_letters):
+    scheduler = RetryScheduler(max_attempts=MAX_ATTEMPTS, base_delay=60)
+    etl = FakeEtl({"1": [None], "2": [None]})
+
+    def cpfs():
+        yield "1"
+        yield "2"
+        raise KeyboardInterrupt
+
+    started = time.monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        main.process_loop(etl, cpfs(), scheduler)
+
+    assert time.monotonic() - started < 1
+    assert sorted(etl.released) == ["1", "2"]
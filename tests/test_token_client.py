@@ -0,0 +1,118 @@
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from benchmarks.mock_ro_server import (
+    MOCK_PASSWORD,
+    MOCK_USERNAME,
+    MockRoHandler,
+    serve_in_background,
+    token_url,
+)
+from src.core import token_client, token_manager
+from src.core.token_client import OAuthTokenClient, OAuthTokenError
+
+
+@pytest.fixture(scope="module")
+def server():
+    server, _ = serve_in_background(latency=0)
+    yield server
+    server.shutdown()
+
+
+def _serve(body: bytes):
+    """oauth/token que responde 200 com `body` cru"""
+
+    class Handler(MockRoHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", "0")))
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_fetch(server):
+    client = OAuthTokenClient(token_url(server), MOCK_USERNAME, MOCK_PASSWORD)
+
+    before = time.time()
+    data = client.fetch()
+
+    assert data["access_token"].startswith("mock-")
+    assert data["expires_in"] == MockRoHandler.token_ttl
+    assert before <= data["obtained_at"] <= time.time()
+
+
+def test_fetch_rejected(server):
+    client = OAuthTokenClient(token_url(server), MOCK_USERNAME, "errada")
+
+    with pytest.raises(OAuthTokenError, match="400"):
+        client.fetch()
+
+
+@pytest.mark.parametrize(
+    ("body", "message"),
+    [
+        (b"<html>manutencao</html>", "JSON"),
+        (b'{"token_type": "bearer"}', "access_token"),
+    ],
+)
+def test_fetch_unusable_body(body, message):
+    server = _serve(body)
+    try:
+        client = OAuthTokenClient(
+            token_url(server), MOCK_USERNAME, MOCK_PASSWORD
+        )
+        with pytest.raises(OAuthTokenError, match=message):
+            client.fetch()
+    finally:
+        server.shutdown()
+
+
+def _login_env(monkeypatch, server, password):
+    monkeypatch.setattr(token_client, "OAUTH_TOKEN_URL", token_url(server))
+    monkeypatch.setattr(token_client, "OAUTH_CLIENT_ID", None)
+    monkeypatch.setenv("USERNAME_RO", MOCK_USERNAME)
+    monkeypatch.setenv("PASSWORD_RO", password)
+    written, selenium = [], []
+    monkeypatch.setattr(token_manager, "write_token_file", written.append)
+    monkeypatch.setattr(
+        token_manager, "selenium_login", lambda: selenium.append(True)
+    )
+    return written, selenium
+
+
+def test_default_login_uses_oauth(monkeypatch, server):
+    written, selenium = _login_env(monkeypatch, server, MOCK_PASSWORD)
+
+    token_manager.default_login()
+
+    assert len(written) == 1
+    assert "access_token" in written[0]
+    assert not selenium
+
+
+def test_default_login_falls_back_to_selenium(monkeypatch, server):
+    written, selenium = _login_env(monkeypatch, server, "errada")
+
+    token_manager.default_login()
+
+    assert not written
+    assert selenium == [True]
+
+
+def test_selenium_is_active(monkeypatch, server):
+    monkeypatch.setattr(token_client, "OAUTH_TOKEN_URL", None)
+    assert token_manager.selenium_is_active(token_manager.default_login)
+    assert token_manager.selenium_is_active(token_manager.selenium_login)
+    assert not token_manager.selenium_is_active(lambda: None)
+
+    monkeypatch.setattr(token_client, "OAUTH_TOKEN_URL", token_url(server))
+    assert not token_manager.selenium_is_active(token_manager.default_login)
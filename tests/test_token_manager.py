@@ -0,0 +1,141 @@
+import multiprocessing as mp
+import os
+import time
+
+import pytest
+
+from src.core import scraper_token, token_manager
+from src.core.token_manager import TokenManager, write_token_file
+
+RETRY_INTERVAL = 0.5
+WAIT = 1.2
+SHARDS = 4
+
+
+def _write(path, access_token: str, expires_in: float):
+    write_token_file(
+        {
+            "access_token": access_token,
+            "expires_in": expires_in,
+            "obtained_at": time.time(),
+        },
+        str(path),
+    )
+
+
+def test_login_that_writes_nothing_fails(tmp_path):
+    path = tmp_path / "token_response.json"
+    _write(path, "old", expires_in=60)
+    manager = TokenManager(
+        path=str(path), login=lambda: None, refresh_margin=120, store=None
+    )
+
+    with pytest.raises(RuntimeError):
+        manager.load()
+    assert manager.refreshes == 0
+
+
+class FakePool:
+    def __init__(self):
+        self.warm_ups = 0
+
+    def warm_up(self):
+        self.warm_ups += 1
+
+
+def test_chrome_warms_only_in_the_process_that_logs_in(
+    tmp_path, monkeypatch
+):
+    path = tmp_path / "token_response.json"
+    _write(path, "old", expires_in=3600)
+    pool = FakePool()
+    monkeypatch.setattr(token_manager, "selenium_is_active", lambda _: True)
+    monkeypatch.setattr(scraper_token, "default_driver_pool", lambda: pool)
+    manager = TokenManager(
+        path=str(path),
+        login=lambda: _write(path, "new", expires_in=3600),
+        refresh_margin=120,
+        store=None,
+    )
+
+    manager.load()
+    manager.start()
+    manager.stop()
+    assert pool.warm_ups == 0  # token válido: nenhum Chrome ocioso
+
+    manager.refresh(stale_token="old")
+    assert pool.warm_ups == 1
+    assert manager.token == "new"
+
+
+def test_failed_login_backs_off_in_background(tmp_path):
+    path = tmp_path / "token_response.json"
+    _write(path, "old", expires_in=60)
+    calls = []
+    manager = TokenManager(
+        path=str(path),
+        login=lambda: calls.append(time.monotonic()),
+        refresh_margin=120,
+        retry_interval=RETRY_INTERVAL,
+        store=None,
+    )
+    with pytest.raises(RuntimeError):
+        manager.load()
+    calls.clear()
+
+    manager.start()
+    time.sleep(WAIT)
+    manager.stop()
+
+    # uma tentativa por retry_interval, não um login atrás do outro
+    assert 1 <= len(calls) <= WAIT // RETRY_INTERVAL + 1
+    assert manager.refreshes == 0
+
+
+def test_login_with_new_token_refreshes(tmp_path):
+    path = tmp_path / "token_response.json"
+    _write(path, "old", expires_in=60)
+    manager = TokenManager(
+        path=str(path),
+        login=lambda: _write(path, "new", expires_in=1800),
+        refresh_margin=120,
+        store=None,
+    )
+
+    info = manager.load()
+
+    assert info.access_token == "new"
+    assert manager.refreshes == 1
+
+
+def _shard(path, counter, barrier):
+    def login():
+        with open(counter, "a") as f:
+            f.write("login\n")
+        time.sleep(0.3)
+        _write(path, f"new-{os.getpid()}", expires_in=1800)
+
+    manager = TokenManager(
+        path=str(path), login=login, refresh_margin=120, store=None
+    )
+    barrier.wait()
+    manager.load()
+
+
+def test_processes_share_one_login(tmp_path):
+    path = tmp_path / "token_response.json"
+    counter = tmp_path / "logins"
+    _write(path, "old", expires_in=60)
+    ctx = mp.get_context("fork")
+    barrier = ctx.Barrier(SHARDS)
+    shards = [
+        ctx.Process(target=_shard, args=(path, counter, barrier))
+        for _ in range(SHARDS)
+    ]
+    for shard in shards:
+        shard.start()
+    for shard in shards:
+        shard.join(timeout=10)
+
+    assert [shard.exitcode for shard in shards] == [0] * SHARDS
+    assert counter.read_text().splitlines() == ["login"]
@@ -0,0 +1,68 @@
+from decimal import Decimal
+
+from benchmarks.mock_ro_server import fake_cpf, fake_payload
+from src.core.transform import (
+    RESULT_COLUMNS,
+    build_result_frame,
+    build_result_rows,
+)
+
+
+def _per_item(payloads):
+    return [
+        row for cpf, data in payloads for row in build_result_rows(data, cpf)
+    ]
+
+
+def test_frame_matches_per_item_rows():
+    payloads = [
+        (fake_cpf(i), fake_payload(fake_cpf(i)) * 2) for i in range(50)
+    ]
+
+    # 1, 1.0 e True são iguais para o hash do pandas, mas não no texto
+    mixed = [
+        {"numMatricula": 1, "margemDisponivel": 0, "isPensionista": "True"},
+        {"numMatricula": 1.0, "margemDisponivel": 0.0, "isPensionista": "1"},
+        {"numMatricula": True, "isPensionista": "True"},
+        {"numMatricula": 0, "margemCartaoDisponivel": 1.0},
+        {"numMatricula": 0.0, "margemCartaoDisponivel": 1},
+    ]
+    payloads += [(fake_cpf(100 + i), [item]) for i, item in enumerate(mixed)]
+
+    frame = build_result_frame(payloads)
+
+    assert frame.to_dict(orient="records") == _per_item(payloads)
+
+
+def test_frame_keeps_api_text_and_defaults():
+    payloads = [
+        (
+            "12345678909",
+            [
+                {
+                    "nomFuncionario": " A ",
+                    "numMatricula": 1,
+                    "margemDisponivel": 0,
+                    "margemCartaoDisponivel": "12.50",
+                },
+                {"nomFuncionario": "B", "margemCartaoBeneficio": -3.5},
+            ],
+        ),
+        ("98765432100", []),
+    ]
+
+    frame = build_result_frame(payloads)
+
+    assert frame.to_dict(orient="records") == _per_item(payloads)
+    assert frame["margem_cartao"].tolist() == [
+        Decimal("12.50"),
+        Decimal("0.0"),
+    ]
+    assert frame["list_status"].tolist() == [True, False]
+
+
+def test_empty_frame():
+    frame = build_result_frame([("12345678909", []), ("98765432100", None)])
+
+    assert frame.empty
+    assert list(frame.columns) == RESULT_COLUMNS + ["content_hash"]
@@ -0,0 +1,125 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy.dialects import postgresql
+
+from benchmarks.mock_ro_server import fake_cpf
+from src.api import ExtractTransformLoad
+from src.database.work_queue import WorkQueue
+from src.database.writer import BulkResultWriter
+
+BATCH = 2
+MAX_PENDING_BATCHES = 2
+CPFS = 20
+
+
+class FlakyBind:
+    """Engine falso: `begin` falha enquanto `down`"""
+
+    def __init__(self):
+        self.down = True
+        self.statements = 0
+        self.executed = []
+
+    @contextmanager
+    def begin(self):
+        if self.down:
+            raise ConnectionError("banco fora")
+        yield self
+
+    def execute(self, stmt):
+        self.statements += 1
+        self.executed.append(stmt)
+
+
+def _produce(writer, added):
+    for i in range(CPFS):
+        writer.add_invalid(f"{i:011d}")
+        added.append(i)
+
+
+def test_add_blocks_while_flushes_fail():
+    bind = FlakyBind()
+    writer = BulkResultWriter(
+        batch_size=BATCH,
+        flush_interval=0.05,
+        bind=bind,
+        max_pending_batches=MAX_PENDING_BATCHES,
+    )
+    added = []
+    producer = threading.Thread(target=_produce, args=(writer, added))
+    producer.start()
+    time.sleep(0.5)
+
+    # parado no limite em vez de crescer o buffer
+    assert producer.is_alive()
+    assert len(added) <= BATCH * MAX_PENDING_BATCHES
+    assert writer._pending() <= BATCH * MAX_PENDING_BATCHES
+
+    bind.down = False
+    producer.join(timeout=5)
+    writer.close()
+
+    assert not producer.is_alive()
+    assert len(added) == CPFS
+    assert writer.cpfs_invalid == CPFS
+    assert writer.stats()["backpressure_waits"] >= 1
+
+
+def test_close_wakes_blocked_producers():
+    writer = BulkResultWriter(
+        batch_size=BATCH, flush_interval=60, bind=FlakyBind()
+    )
+    added = []
+    producer = threading.Thread(target=_produce, args=(writer, added))
+    producer.start()
+    time.sleep(0.2)
+    assert producer.is_alive()
+
+    try:
+        writer.close()
+    except ConnectionError:
+        pass  # o último flush também falha: banco continua fora
+    producer.join(timeout=5)
+
+    assert not producer.is_alive()
+
+
+class NoResultsEtl(ExtractTransformLoad):
+    """A API respondeu [] (CPF sem vínculo): só marca o CPF no flush"""
+
+    def fetch_cpf(self, cpf):
+        return []
+
+
+def test_failed_inline_flush_is_not_a_cpf_failure():
+    bind = FlakyBind()
+    writer = BulkResultWriter(batch_size=1, flush_interval=60, bind=bind)
+    etl = NoResultsEtl(writer=writer)
+    cpf = fake_cpf(1)
+
+    # batch_size=1: o add_raw dispara o flush, que falha com o banco fora
+    assert etl.get_request(cpf) == []  # None faria o process_loop repetir
+    assert writer.stats()["pending_cpfs"] == 1
+
+    bind.down = False
+    writer.close()
+    assert writer.cpfs_written == 1
+
+
+def test_queue_worker_only_finishes_its_own_claims():
+    bind = FlakyBind()
+    bind.down = False
+    writer = BulkResultWriter(batch_size=10, flush_interval=60, bind=bind)
+    etl = NoResultsEtl(writer=writer)
+    etl.use_work_queue(WorkQueue(worker_id="w1", bind=bind))
+
+    etl.get_request(fake_cpf(1))
+    writer.close()
+
+    (stmt,) = bind.executed
+    sql = str(stmt.compile(dialect=postgresql.dialect()))
+    where = sql.split("WHERE")[1]
+    assert "claimed_by" in where
+    assert "status" in where